@@ -0,0 +1,221 @@
+"""Benchmark the storage and drawing functions on synthetic data.
+
+Run it from the project root with `python -m benchmarks.run`.
+"""
+
+import copy
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Final, List, Tuple
+
+import click
+
+from src.config import DrawConfig, FetchConfig
+from src.drawing import draw_html_calendar, draw_text_calendar, prepare_data_for_display
+from src.models import Game
+from src.storage import load_from_file, save_to_file
+
+from .synthetic import generate_games
+
+BASELINE_FILE: Final = Path(__file__).parent / "baseline.json"
+
+# Number of games and events of each scale
+SCALES: Final[Dict[str, Tuple[int, int]]] = {
+    "small": (50, 1_000),
+    "medium": (200, 10_000),
+    "large": (1_000, 100_000),
+}
+
+# Shortest time measured at once, so that short functions are run several
+# times and the timer and scheduler noise stays small in comparison
+MIN_MEASURE_TIME: Final[float] = 0.2
+
+# Result of a benchmark, per data set (see get_results_key) and function
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def get_results_key(scale: str, days: int) -> str:
+    """Return the key of the results of a data set, like "small@1825d".
+
+    Results of data sets generated with other parameters are never compared.
+    """
+    return f"{scale}@{days}d"
+
+
+@dataclass
+class Measure:
+    # Best duration of the runs, in seconds
+    seconds: float
+    # Peak of memory allocated during one run, in bytes
+    peak_bytes: int
+
+    def to_json(self) -> Dict:
+        """Dump the Measure to a raw data dict.
+        :return: The raw data dict
+        """
+        return dict(seconds=round(self.seconds, 6), peak_bytes=self.peak_bytes)
+
+
+def measure(func: Callable[[], object], setup: Callable[[], None], repeat: int) -> Measure:
+    """Time a function several times, then measure its memory peak once.
+
+    Each timed run calls the function until MIN_MEASURE_TIME is spent in it,
+    and keeps the mean duration of a call.
+    :param func: The function to benchmark
+    :param setup: A function called before each call, not measured
+    :param repeat: The number of timed runs
+    :return: The best duration and the memory peak
+    """
+    durations: List[float] = []
+    for _ in range(repeat):
+        total: float = 0.0
+        calls: int = 0
+        while total < MIN_MEASURE_TIME:
+            setup()
+            gc.collect()
+            start = time.perf_counter()
+            func()
+            total += time.perf_counter() - start
+            calls += 1
+        durations.append(total / calls)
+
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measure(seconds=min(durations), peak_bytes=peak_bytes)
+
+
+def run_scale(game_count: int, event_count: int, day_spread: int, repeat: int, work_dir: Path) -> Dict[str, Measure]:
+    """Benchmark every function on one scale of synthetic data."""
+    original_games: List[Game] = generate_games(game_count, event_count, day_spread=day_spread)
+    data_file = work_dir / "dump.json"
+    fetch_config = FetchConfig(profile_url="", destination_file=data_file)
+    text_config = DrawConfig(mode="text", data_file=data_file, export_file=work_dir / "cal.txt")
+    html_config = DrawConfig(mode="html", data_file=data_file, export_file=work_dir / "cal.html")
+    save_to_file(original_games, config=fetch_config)
+
+    # prepare_data_for_display modifies the events, so every run gets a copy
+    games: List[Game] = []
+
+    def copy_games() -> None:
+        nonlocal games
+        games = copy.deepcopy(original_games)
+
+    def no_setup() -> None:
+        pass
+
+    return {
+        "save_to_file": measure(lambda: save_to_file(original_games, config=fetch_config), no_setup, repeat),
+        "load_from_file": measure(lambda: load_from_file(data_file), no_setup, repeat),
+        "prepare_data_for_display": measure(lambda: prepare_data_for_display(games), copy_games, repeat),
+        "draw_text_calendar": measure(lambda: draw_text_calendar(games, config=text_config), copy_games, repeat),
+        "draw_html_calendar": measure(lambda: draw_html_calendar(games, config=html_config), copy_games, repeat),
+    }
+
+
+def compare_to_baseline(
+        results: Results,
+        baseline: Results,
+        time_tolerance: float,
+        memory_tolerance: float,
+) -> List[str]:
+    """Return a message for each result worse than the baseline.
+    :param results: The new results
+    :param baseline: The stored results
+    :param time_tolerance: The allowed duration increase (0.5 means +50 %)
+    :param memory_tolerance: The allowed memory peak increase
+    :return: The list of regressions, empty if there's none
+    """
+    regressions: List[str] = []
+    for data_set, functions in results.items():
+        for name, result in functions.items():
+            base = baseline.get(data_set, {}).get(name)
+            if base is None:
+                continue
+            for key, tolerance in (("seconds", time_tolerance), ("peak_bytes", memory_tolerance)):
+                if result[key] > base[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{data_set}/{name}: {key} went from {base[key]} to {result[key]} "
+                        f"(more than +{tolerance:.0%})"
+                    )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "-s", "--scale", "scales",
+    type=click.Choice(list(SCALES)),
+    multiple=True,
+    default=("small", "medium"),
+    show_default=True,
+    help="Scales of synthetic data to benchmark",
+)
+@click.option("-d", "--days", type=click.IntRange(min=1), default=5 * 365, show_default=True,
+              help="Number of days over which the events are spread")
+@click.option("-r", "--repeat", type=click.IntRange(min=1), default=3, show_default=True,
+              help="Number of timed runs, the best one is kept")
+@click.option("--time-tolerance", type=float, default=0.5, show_default=True,
+              help="Allowed duration increase over the baseline")
+@click.option("--memory-tolerance", type=float, default=0.2, show_default=True,
+              help="Allowed memory peak increase over the baseline")
+@click.option(
+    "-b", "--baseline", "baseline_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=BASELINE_FILE,
+    show_default=True,
+    help="Path of the baseline file",
+)
+@click.option("--update-baseline", is_flag=True, help="Save the results as the new baseline")
+def bench_command(
+        scales: Tuple[str, ...],
+        days: int,
+        repeat: int,
+        time_tolerance: float,
+        memory_tolerance: float,
+        baseline_file: Path,
+        update_baseline: bool,
+) -> None:
+    """Benchmark the storage and drawing functions, and fail on regressions."""
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in scales:
+            game_count, event_count = SCALES[scale]
+            click.echo(f"----- {scale}: {game_count} games, {event_count} events over {days} days -----")
+            measures = run_scale(game_count, event_count, days, repeat, Path(work_dir))
+            for name, result in measures.items():
+                click.echo(f"{name:26} {result.seconds:>10.4f} s {result.peak_bytes / 2 ** 20:>10.2f} MiB")
+            results[get_results_key(scale, days)] = {name: result.to_json() for name, result in measures.items()}
+
+    baseline: Results = {}
+    if baseline_file.is_file():
+        baseline = json.loads(baseline_file.read_text(encoding="utf8"))
+
+    if update_baseline:
+        baseline.update(results)
+        baseline_file.write_text(json.dumps(baseline, indent=4) + "\n", encoding="utf8")
+        click.echo(f"Baseline saved to {baseline_file}")
+        return
+
+    for data_set in results.keys() - baseline.keys():
+        click.echo(f"No baseline for {data_set}, run with --update-baseline to create it", err=True)
+    regressions = compare_to_baseline(results, baseline, time_tolerance, memory_tolerance)
+    for regression in regressions:
+        click.echo(f"REGRESSION {regression}", err=True)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    bench_command()
@@ -0,0 +1,40 @@
+"""Define the generator of synthetic game data for the benchmarks."""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from src.models import Event, Game
+
+DEFAULT_START = datetime(2018, 1, 1, tzinfo=timezone.utc)
+
+
+def generate_games(
+        game_count: int,
+        event_count: int,
+        day_spread: int = 5 * 365,
+        start: datetime = DEFAULT_START,
+        seed: int = 0,
+) -> List[Game]:
+    """Generate games with achievement events spread over a period.
+    :param game_count: The number of games
+    :param event_count: The total number of events, shared between the games
+    :param day_spread: The number of days over which the events are spread
+    :param start: The date of the first possible event
+    :param seed: The seed of the generator, for reproducible data
+    :return: The list of games
+    """
+    rng = random.Random(seed)
+    games = [Game(id=str(10 + i), name=f"Game {i:05}") for i in range(game_count)]
+    spread_seconds: int = day_spread * 24 * 60 * 60
+    for event_no in range(event_count):
+        game = rng.choice(games)
+        event_date = start + timedelta(seconds=rng.randrange(spread_seconds))
+        game.events.append(Event.create_achievement_event(
+            event_date=event_date,
+            title=f"Achievement {event_no}",
+            desc=f"Description of the achievement {event_no}",
+        ))
+    for game in games:
+        game.events.sort(key=lambda event: event.date)
+    return games
@@ -2,17 +2,24 @@
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Final, Literal, Tuple
+from typing import Final, List, Literal, Optional, Tuple
+from urllib.parse import urlsplit
 
-ExportMode = Literal["text", "html"]
+ExportMode = Literal["text", "html", "heatmap"]
+StatsPeriod = Literal["month", "year"]
 
 HOME_PAGE: Final = "https://store.steampowered.com/"
 LOGIN_PAGE: Final = "https://store.steampowered.com/login"
 LOGIN_WAIT_TIMEOUT: Final[int] = 60 * 60  # Time spent waiting for the user to log in, in seconds
+MAX_LANGUAGE_TRIES: Final[int] = 5  # Page loads to get an achievement page in english
+MAX_RATE_LIMITED_TRIES: Final[int] = 5  # Page loads of the same URL while Steam rate limits us
 
 ROOT_PATH = Path(__file__).parent.parent
 DEFAULT_DATA_FILE = ROOT_PATH / "dump.json"
 DEFAULT_EXPORT_FILE = ROOT_PATH / "cal.html"
+DEFAULT_SERVE_HOST: Final = "127.0.0.1"
+DEFAULT_SERVE_PORT: Final[int] = 8000
+DEFAULT_REFRESH_INTERVAL: Final[int] = 6 * 60 * 60  # Time between two fetches of the served data, in seconds
 
 
 @dataclass
@@ -27,21 +34,61 @@ class FetchConfig:
     no_achievements: bool = False
     # List of game ID. Only parse the achievements of those games.
     only_achievements_for: Tuple[str, ...] = field(default_factory=tuple)
+    # Whether to fetch the achievements of the games that the game list shows
+    # without unlocked achievements
+    all_achievements: bool = False
+    # Maximum number of page loads per second
+    max_request_rate: float = 1.0
+    # Number of page loads that can be sent at once, before the rate applies
+    request_burst: int = 3
 
     def games_url(self) -> str:
         """URL used to fetch the game list"""
         stripped_profile_url = self.profile_url.rstrip('/')
         return f"{stripped_profile_url}/games/?tab=all&sort=name"
 
-    def achievements_url(self, game_id: str) -> str:
-        """URL used to fetch the game list"""
+    def achievements_url(self, game_id: str, profile_url: Optional[str] = None) -> str:
+        """URL used to fetch the achievements of a game
+
+        :param game_id: The Steam ID of the game, or the name Steam uses
+            instead in the stats URL
+        :param profile_url: The profile URL to use instead of the configured one
+        """
         # Team Fortress 2 acts differently.
         if game_id == "440":
             game_id = "TF2"
-        stripped_profile_url = self.profile_url.rstrip('/')
+        stripped_profile_url = (profile_url or self.profile_url).rstrip('/')
         return f"{stripped_profile_url}/stats/{game_id}/?tab=achievements"
 
 
+def get_profile_name(profile_url: str) -> str:
+    """Return the custom ID or the Steam ID of a profile URL.
+
+    The ID is the path segment after "/id/" or "/profiles/", or the last path
+    segment of unexpected URLs. The query and the fragment are ignored.
+    """
+    segments = [segment for segment in urlsplit(profile_url).path.split("/") if segment]
+    for kind in ("id", "profiles"):
+        if kind in segments[:-1]:
+            return segments[segments.index(kind) + 1]
+    return segments[-1] if segments else ""
+
+
+def get_profile_data_file(data_file: Path, profile_url: str) -> Path:
+    """Return the data file of one profile among several ("dump-NAME.json")."""
+    return data_file.with_name(f"{data_file.stem}-{get_profile_name(profile_url)}{data_file.suffix}")
+
+
+def read_profiles_file(path: Path) -> List[str]:
+    """Return the profile URLs of a file, one per line.
+
+    Empty lines and lines starting with "#" are ignored.
+    """
+    with path.open(encoding="utf8") as source_file:
+        lines = (line.strip() for line in source_file)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
 @dataclass
 class DrawConfig:
     # Export mode (text, html, ...)
@@ -58,3 +105,26 @@ class DrawConfig:
             self.export_file = self.export_file.with_suffix(
                 ".txt" if self.mode == "text" else ".html"
             )
+
+
+@dataclass
+class StatsConfig:
+    # File where the data will be read
+    data_file: Path = DEFAULT_DATA_FILE
+    # Length of the periods to summarize (month, year)
+    period: StatsPeriod = "month"
+    # Number of games to display per period
+    top: int = 3
+
+
+@dataclass
+class ServeConfig:
+    # Configuration of the fetch done at each refresh
+    fetch: FetchConfig
+    # Export mode of the served calendar (text, html, ...)
+    mode: ExportMode = "html"
+    # Address and port of the HTTP server
+    host: str = DEFAULT_SERVE_HOST
+    port: int = DEFAULT_SERVE_PORT
+    # Time between two refreshes of the data, in seconds
+    refresh_interval: int = DEFAULT_REFRESH_INTERVAL
@@ -2,22 +2,29 @@
 
 import calendar
 import contextlib
+import io
 import itertools
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, Generator, List, Optional, Tuple
-
-import jinja2
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Final, Generator, List, Optional, Tuple
 
 from .config import DrawConfig
 from .logger import logger
-from .models import Event, Game
+from .metrics import metrics
+from .models import DayIndex, Event, Game
+
+if TYPE_CHECKING:
+    import jinja2
 
 cal = calendar.Calendar()
 
 YearMonth = Tuple[int, int]
 
+# Number of color shades used for the active days of the heatmap
+HEATMAP_LEVELS: Final[int] = 4
+
 
 @dataclass
 class PrepDay:
@@ -40,6 +47,21 @@ class PrepMonth:
     lines: List[PrepLine]
 
 
+@dataclass
+class HeatDay:
+    day: int
+    event_count: int
+    level: int
+
+
+@dataclass
+class HeatMonth:
+    year: int
+    month: int
+    event_count: int
+    days: List[HeatDay]
+
+
 def get_days_in_month(year: int, month: int, padding=True) -> List[int]:
     """Return the days numbers in a month.
     :param year: The year of the month
@@ -54,7 +76,7 @@ def get_days_in_month(year: int, month: int, padding=True) -> List[int]:
     return list(generator)
 
 
-def range_year_month(start: datetime, end: datetime) -> Generator[YearMonth, None, None]:
+def range_year_month(start: date, end: date) -> Generator[YearMonth, None, None]:
     """Return all the couples (year, month) between two dates."""
     # Build all the couples (year, months)
     i1 = itertools.product(range(start.year, end.year + 1), range(1, 12 + 1))
@@ -166,17 +188,23 @@ def draw_text_month(month_data: PrepMonth) -> None:
         draw_text_line(line_data)
 
 
-def draw_text_calendar(games: List[Game], config: DrawConfig) -> None:
-    """Draw the whole calendar as text."""
-    data = prepare_data_for_display(games)
+def render_text_calendar(games: List[Game]) -> str:
+    """Return the whole calendar as text."""
+    with metrics.span("prepare"):
+        data = prepare_data_for_display(games)
     if data is None:
         raise ValueError("There's no data to display")
-    destination_file = config.export_file
-    with destination_file.open("w", encoding="utf8") as file:
-        logger.info("Export the calendar as text to %s", destination_file)
-        with contextlib.redirect_stdout(file):
+    with metrics.span("render"), io.StringIO() as output:
+        with contextlib.redirect_stdout(output):
             for month_data in data:
                 draw_text_month(month_data)
+        return output.getvalue()
+
+
+def draw_text_calendar(games: List[Game], config: DrawConfig) -> None:
+    """Draw the whole calendar as text."""
+    rendered = render_text_calendar(games)
+    export_to_file(rendered, config.export_file, "the calendar as text")
 
 
 # HTMl CALENDAR
@@ -195,26 +223,105 @@ def make_day_description(events: List[Event]) -> str:
         return f"{length} events :\n{summary}"
 
 
-def draw_html_calendar(games: List[Game], config: DrawConfig) -> None:
-    """Draw the whole calendar as HTML."""
-    # Create the jinja environment
+def get_template(name: str) -> "jinja2.Template":
+    """Create the jinja environment and return one of its templates."""
+    # Imported here, as the text calendar doesn't need it
+    import jinja2
+
     jinja_env = jinja2.Environment(
         loader=jinja2.PackageLoader("src"),
         autoescape=jinja2.select_autoescape(),
         trim_blocks=True,
         lstrip_blocks=True,
     )
-    template = jinja_env.get_template("html_calendar.jinja2")
+    return jinja_env.get_template(name)
+
+
+def export_to_file(rendered: str, destination_file: Path, description: str) -> None:
+    """Write a rendered calendar to a file."""
+    with metrics.span("export"), destination_file.open("w", encoding="utf8") as file:
+        logger.info("Export %s to %s", description, destination_file)
+        file.write(rendered)
+        metrics.incr("bytes", file.tell())
+
+
+def render_html_calendar(games: List[Game]) -> str:
+    """Return the whole calendar as HTML."""
+    template = get_template("html_calendar.jinja2")
     # Prepare the data
-    data = prepare_data_for_display(games)
+    with metrics.span("prepare"):
+        data = prepare_data_for_display(games)
     if data is None:
         raise ValueError("There's no data to display")
-    # Render the template to a file
-    destination_file = config.export_file
-    with destination_file.open("w", encoding="utf8") as file:
-        logger.info("Export the calendar as HTML to %s", destination_file)
-        rendered = template.render(
+    # Render the template
+    with metrics.span("render"):
+        return template.render(
             data=data,
             make_day_description=make_day_description,
         )
-        file.write(rendered)
+
+
+def draw_html_calendar(games: List[Game], config: DrawConfig) -> None:
+    """Draw the whole calendar as HTML."""
+    rendered = render_html_calendar(games)
+    export_to_file(rendered, config.export_file, "the calendar as HTML")
+
+
+# HTML HEATMAP
+
+def get_heat_level(event_count: int, max_count: int) -> int:
+    """Return the color shade of a day, from 0 (no events) to HEATMAP_LEVELS."""
+    if event_count <= 0:
+        return 0
+    # Round up, so that every active day gets at least the first shade
+    return -(-event_count * HEATMAP_LEVELS // max_count)
+
+
+def prepare_heatmap_for_display(index: DayIndex) -> Optional[List[HeatMonth]]:
+    """Return a structure of months and days with their total event count,
+    suitable for display.
+    :param index: The day index to prepare
+    :return: The convenient data structure, or None if no events have been found
+    """
+    if not index.day_counts:
+        return None
+
+    days: List[date] = list(index.day_counts)
+    max_count: int = max(index.day_counts.values())
+
+    rv: List[HeatMonth] = []
+    for year, month in range_year_month(min(days), max(days)):
+        days_data: List[HeatDay] = []
+        for day in get_days_in_month(year, month):
+            event_count = index.day_counts.get(date(year, month, day), 0) if day != 0 else 0
+            days_data.append(HeatDay(
+                day=day,
+                event_count=event_count,
+                level=get_heat_level(event_count, max_count),
+            ))
+        month_data = HeatMonth(
+            year=year,
+            month=month,
+            event_count=sum(d.event_count for d in days_data),
+            days=days_data,
+        )
+        rv.append(month_data)
+
+    return rv
+
+
+def render_heatmap_calendar(index: DayIndex) -> str:
+    """Return the events of all games per day as an HTML heatmap."""
+    template = get_template("html_heatmap.jinja2")
+    with metrics.span("prepare"):
+        data = prepare_heatmap_for_display(index)
+    if data is None:
+        raise ValueError("There's no data to display")
+    with metrics.span("render"):
+        return template.render(data=data)
+
+
+def draw_heatmap_calendar(index: DayIndex, config: DrawConfig) -> None:
+    """Draw the events of all games per day as an HTML heatmap."""
+    rendered = render_heatmap_calendar(index)
+    export_to_file(rendered, config.export_file, "the heatmap as HTML")
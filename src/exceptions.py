@@ -9,3 +9,8 @@ class STCException(Exception):
 class TimeoutException(STCException):
     """The exception that occur when an operation is too long"""
     pass
+
+
+class RateLimitedException(STCException):
+    """The exception that occur when Steam keeps refusing our requests"""
+    pass
@@ -36,3 +36,9 @@ stream_handler.setFormatter(
     ColoredFormatter(LOG_FORMAT) if DEV_MODE else logging.Formatter(LOG_FORMAT)
 )
 logger.addHandler(stream_handler)
+
+
+def enable_verbose_logging() -> None:
+    """Display the debug messages, as in DEV_MODE."""
+    logger.setLevel(logging.DEBUG)
+    stream_handler.setFormatter(ColoredFormatter(LOG_FORMAT))
@@ -1,48 +1,79 @@
-"""Define the command line endpoints."""
+"""Define the command line endpoints.
 
+The heavy modules (Playwright and BeautifulSoup in parsing, Jinja in drawing)
+are only imported by the commands that use them, to keep the start fast.
+"""
+
+from collections import Counter
 from pathlib import Path
-from typing import List, Tuple
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
 import click
 
-from .config import DEFAULT_DATA_FILE, DEFAULT_EXPORT_FILE, DrawConfig, ExportMode, FetchConfig
-from .drawing import draw_html_calendar, draw_text_calendar
+from .config import (
+    DEFAULT_DATA_FILE, DEFAULT_EXPORT_FILE, DEFAULT_REFRESH_INTERVAL, DEFAULT_SERVE_HOST, DEFAULT_SERVE_PORT,
+    DrawConfig, ExportMode, FetchConfig, ServeConfig, StatsConfig, StatsPeriod,
+    get_profile_data_file, read_profiles_file,
+)
 from .exceptions import STCException
-from .logger import logger
+from .logger import enable_verbose_logging, logger
+from .metrics import metrics
 from .models import Game
-from .parsing import MyWebDriver
+from .planning import ProfileGames, plan_achievements_fetch
+from .stats import build_day_index, format_stats, get_day_index
 from .storage import load_from_file, save_to_file
 
+if TYPE_CHECKING:
+    from .parsing import MyWebDriver
+
 
-def fetch(config: FetchConfig) -> None:
-    """Fetch data by scraping Steam with Selenium."""
+def fetch_profiles(
+        driver: "MyWebDriver",
+        configs: List[FetchConfig],
+        on_profile_fetched: Callable[[FetchConfig, List[Game]], None],
+) -> None:
+    """Fetch the data of several profiles with the same browser and login.
 
-    driver = MyWebDriver(config=config)
+    :param driver: The web driver to use
+    :param configs: The configuration of each profile
+    :param on_profile_fetched: Called with the games of each profile, as soon
+        as its last page is fetched
+    """
+    profiles: List[ProfileGames] = []
+    for config in configs:
+        driver.switch_profile(config)
+        profiles.append((config, driver.get_game_list()))
 
-    try:
-        games = driver.get_game_list()
+    # Number of achievement pages left to fetch per profile
+    plan = plan_achievements_fetch(profiles)
+    pages_left: Counter = Counter(config.destination_file for config, _ in plan)
+    for config, games in profiles:
+        if pages_left[config.destination_file] == 0:
+            on_profile_fetched(config, games)
+
+    games_by_file: Dict[Path, List[Game]] = {config.destination_file: games for config, games in profiles}
+    for config, game in plan:
+        logger.info("Fetching achievements of '%s' for %s", game.name, config.profile_url)
+        driver.switch_profile(config)
+        game.events = driver.get_achievements_events(game.id)
+        pages_left[config.destination_file] -= 1
+        if pages_left[config.destination_file] == 0:
+            on_profile_fetched(config, games_by_file[config.destination_file])
 
-        # List of games whose achievements will be fetched
-        games_to_parse_achiev: List[Game] = games
 
-        if config.no_achievements:
-            logger.info("Skipping the achievements fetch")
-            games_to_parse_achiev = []
-        elif config.only_achievements_for:
-            logger.info("Fetching achievements of those games : %s", config.only_achievements_for)
-            games_to_parse_achiev = [
-                g for g in games_to_parse_achiev
-                if g.id in config.only_achievements_for
-            ]
-        else:
-            logger.info("Fetching achievements of all games")
+def fetch(configs: List[FetchConfig]) -> None:
+    """Fetch data by scraping Steam with Selenium.
 
-        for game in games_to_parse_achiev:
-            logger.info("Fetching achievements of '%s'", game.name)
-            game.events = driver.get_achievements_events(game.id)
+    All the profiles are fetched with the same browser and login, and the
+    data of each profile is saved as soon as its last page is fetched.
+    """
+    from .parsing import MyWebDriver
 
-        save_to_file(games, config=config)
+    driver = MyWebDriver(config=configs[0])
 
+    try:
+        fetch_profiles(driver, configs, lambda config, games: save_to_file(games, config=config))
     except STCException as err:
         # Only display the main error message
         logger.error(err)
@@ -53,6 +84,11 @@ def fetch(config: FetchConfig) -> None:
 
 
 def draw(config: DrawConfig) -> None:
+    from .drawing import draw_heatmap_calendar, draw_html_calendar, draw_text_calendar
+
+    if config.mode == "heatmap":
+        draw_heatmap_calendar(get_day_index(config.data_file), config=config)
+        return
     games = load_from_file(config.data_file)
     if config.mode == "text":
         draw_text_calendar(games, config=config)
@@ -60,13 +96,137 @@ def draw(config: DrawConfig) -> None:
         draw_html_calendar(games, config=config)
 
 
+def stats(config: StatsConfig) -> None:
+    index = get_day_index(config.data_file)
+    for line in format_stats(index, period=config.period, limit=config.top):
+        click.echo(line)
+
+
+def refresh_forever(
+        config: FetchConfig,
+        refresh_interval: float,
+        on_profile_fetched: Callable[[FetchConfig, List[Game]], None],
+        make_driver: Callable[[FetchConfig], "MyWebDriver"],
+        sleep: Callable[[float], None] = time.sleep,
+) -> None:
+    """Fetch a profile on a schedule with the same browser session, until
+    interrupted.
+
+    :param config: The configuration of the profile
+    :param refresh_interval: The time between the start of two refreshes, in
+        seconds
+    :param on_profile_fetched: Called with the games of each refresh
+    :param make_driver: Start a web driver, at the first refresh and after
+        the browser failed
+    :param sleep: Wait between two refreshes
+    """
+    from playwright.sync_api import Error as PlaywrightError
+
+    def quit_driver(driver: "MyWebDriver") -> None:
+        """Quit a web driver, even if its browser is already dead."""
+        try:
+            driver.quit()
+        except Exception as err:
+            logger.debug("Couldn't quit the Web driver cleanly: %s", err)
+
+    driver: Optional["MyWebDriver"] = None
+    try:
+        while True:
+            started_at = time.monotonic()
+            try:
+                if driver is None:
+                    driver = make_driver(config)
+                fetch_profiles(driver, [config], on_profile_fetched)
+            except STCException as err:
+                logger.error(err)
+            except PlaywrightError as err:
+                # The browser, the page or the session may be dead, so don't
+                # use them again: start a new browser, and log in again, at
+                # the next refresh
+                logger.error("The browser failed, restarting it at the next refresh: %s", err)
+                if driver is not None:
+                    quit_driver(driver)
+                driver = None
+            delay = max(0.0, refresh_interval - (time.monotonic() - started_at))
+            logger.info("Next refresh in %d seconds", delay)
+            sleep(delay)
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+
+
+def serve(config: ServeConfig) -> None:
+    """Serve the calendar over HTTP, and refresh its data on a schedule with
+    the same browser session."""
+    from .drawing import render_heatmap_calendar, render_html_calendar, render_text_calendar
+    from .parsing import MyWebDriver
+    from .serving import CalendarPage, CalendarPublisher, CalendarServer
+
+    def render(games: List[Game]) -> CalendarPage:
+        """Render the games in the configured mode."""
+        if config.mode == "heatmap":
+            return CalendarPage.create(render_heatmap_calendar(build_day_index(games)), "text/html", time.time())
+        if config.mode == "text":
+            return CalendarPage.create(render_text_calendar(games), "text/plain", time.time())
+        return CalendarPage.create(render_html_calendar(games), "text/html", time.time())
+
+    data_file: Path = config.fetch.destination_file
+    server = CalendarServer((config.host, config.port))
+    publisher = CalendarPublisher(render=render, set_page=server.set_page)
+    try:
+        # Serve the data of the last run while the first refresh happens
+        if data_file.is_file():
+            publisher.publish_saved(data_file)
+        server.start_in_thread()
+        refresh_forever(
+            config.fetch,
+            refresh_interval=config.refresh_interval,
+            on_profile_fetched=publisher.on_profile_fetched,
+            make_driver=lambda fetch_config: MyWebDriver(config=fetch_config),
+        )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
 @click.group()
-def main_cli():
+@click.option("-v", "--verbose", is_flag=True, help="Display the debug messages")
+@click.option("--profile", is_flag=True, help="Display the time spent in each phase at the end")
+@click.option(
+    "--metrics", "metrics_file",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="Save the time spent in each phase and the counters to this JSON file",
+)
+@click.pass_context
+def main_cli(ctx: click.Context, verbose: bool, profile: bool, metrics_file: Optional[Path]):
     """View your Steam history on a calendar."""
+    if verbose:
+        enable_verbose_logging()
+    if profile or metrics_file is not None:
+        metrics.enable()
+        # Report the metrics once the command is over, even if it failed
+        ctx.call_on_close(lambda: report_metrics(profile, metrics_file))
+
+
+def report_metrics(profile: bool, metrics_file: Optional[Path]) -> None:
+    """Display the collected metrics and/or save them to a file."""
+    if profile:
+        for line in metrics.format_summary():
+            click.echo(line, err=True)
+    if metrics_file is not None:
+        logger.info("Save metrics to %s", metrics_file)
+        metrics.save(metrics_file)
 
 
 @main_cli.command("fetch")
-@click.argument("steam_profile_url")
+@click.argument("steam_profile_urls", nargs=-1)
+@click.option(
+    "-p", "--profiles-file",
+    type=click.Path(exists=True, dir_okay=False, readable=True, path_type=Path),
+    help="File listing profile URLs to fetch, one per line",
+)
 @click.option("-l", "--login", is_flag=True, help="Prompt the user to login")
 @click.option("-na", "--no-achievements", is_flag=True, help="Don't fetch the achievements dates")
 @click.option(
@@ -75,6 +235,11 @@ def main_cli():
     multiple=True,
     help="Only fetch the achievements dates of games with those ID"
 )
+@click.option(
+    "-aa", "--all-achievements",
+    is_flag=True,
+    help="Also fetch the achievements of games that the game list shows without unlocked achievements",
+)
 @click.option(
     "-o", "--output",
     type=click.Path(dir_okay=False, writable=True, path_type=Path),
@@ -82,34 +247,67 @@ def main_cli():
     show_default=True,
     help="Path of the data file to write",
 )
+@click.option(
+    "-r", "--max-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.0,
+    show_default=True,
+    help="Maximum number of pages loaded per second, lowered automatically if Steam rate limits us",
+)
 def fetch_command(
-        steam_profile_url: str,
+        steam_profile_urls: Tuple[str, ...],
+        profiles_file: Optional[Path],
         login: bool,
         no_achievements: bool,
         only_achievements_for: Tuple[str, ...],
+        all_achievements: bool,
         output: Path,
+        max_rate: float,
 ) -> None:
     """Fetch the Steam data and save it to a file.
 
-    You can find your STEAM_PROFILE_URL by looking at your profile URL."""
+    You can find your STEAM_PROFILE_URL by looking at your profile URL.
+    When several profiles are given, the data of each one is saved to the
+    output path suffixed with the profile name (dump-NAME.json)."""
     if not login:
         click.echo("--login is required for now, as the user game lists seems to be private")
         return
 
-    config = FetchConfig(
-        profile_url=steam_profile_url,
-        login_user=login,
-        no_achievements=no_achievements,
-        only_achievements_for=only_achievements_for,
-        destination_file=output,
-    )
-    fetch(config)
+    profile_urls: List[str] = list(steam_profile_urls)
+    if profiles_file is not None:
+        profile_urls.extend(read_profiles_file(profiles_file))
+    # Remove the duplicates, but keep the order
+    profile_urls = list(dict.fromkeys(url.rstrip("/") for url in profile_urls))
+    if not profile_urls:
+        raise click.UsageError("Give at least one STEAM_PROFILE_URL, or a --profiles-file")
+
+    configs: List[FetchConfig] = [
+        FetchConfig(
+            profile_url=profile_url,
+            login_user=login,
+            no_achievements=no_achievements,
+            only_achievements_for=only_achievements_for,
+            all_achievements=all_achievements,
+            destination_file=output if len(profile_urls) == 1 else get_profile_data_file(output, profile_url),
+            max_request_rate=max_rate,
+        )
+        for profile_url in profile_urls
+    ]
+    # Each profile needs its own file, or its data would overwrite another's
+    profiles_by_file: Dict[Path, str] = {}
+    for config in configs:
+        other_profile_url = profiles_by_file.setdefault(config.destination_file, config.profile_url)
+        if other_profile_url != config.profile_url:
+            raise click.UsageError(
+                f"{other_profile_url} and {config.profile_url} would both be saved to {config.destination_file}"
+            )
+    fetch(configs)
 
 
 @main_cli.command("draw")
 @click.option(
     "-m", "--mode",
-    type=click.Choice(["text", "html"], case_sensitive=False),
+    type=click.Choice(["text", "html", "heatmap"], case_sensitive=False),
     default="html",
     show_default=True,
     help="Change the output mode",
@@ -132,3 +330,96 @@ def draw_command(mode: ExportMode, file: Path, output: Path) -> None:
     """Draw the dates of a data file as a calendar."""
     config = DrawConfig(mode=mode, data_file=file, export_file=output)
     draw(config)
+
+
+@main_cli.command("stats")
+@click.option(
+    "-p", "--period",
+    type=click.Choice(["month", "year"], case_sensitive=False),
+    default="month",
+    show_default=True,
+    help="Summarize the events per month or per year",
+)
+@click.option(
+    "-t", "--top",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Number of most active games to display per period",
+)
+@click.option(
+    "-f", "--file",
+    type=click.Path(exists=True, dir_okay=False, readable=True, path_type=Path),
+    default=DEFAULT_DATA_FILE,
+    show_default=True,
+    help="Path of the data file to parse",
+)
+def stats_command(period: StatsPeriod, top: int, file: Path) -> None:
+    """Summarize the events of a data file.
+
+    The per-day counts are saved next to the data file, and reused until it
+    changes."""
+    config = StatsConfig(data_file=file, period=period, top=top)
+    stats(config)
+
+
+@main_cli.command("serve")
+@click.argument("steam_profile_url")
+@click.option("-l", "--login", is_flag=True, help="Prompt the user to login")
+@click.option(
+    "-m", "--mode",
+    type=click.Choice(["text", "html", "heatmap"], case_sensitive=False),
+    default="html",
+    show_default=True,
+    help="Change the output mode",
+)
+@click.option(
+    "-o", "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=DEFAULT_DATA_FILE,
+    show_default=True,
+    help="Path of the data file to write, and to serve until the first refresh",
+)
+@click.option("-h", "--host", default=DEFAULT_SERVE_HOST, show_default=True, help="Address of the HTTP server")
+@click.option("-p", "--port", type=click.IntRange(0, 65535), default=DEFAULT_SERVE_PORT, show_default=True,
+              help="Port of the HTTP server")
+@click.option(
+    "-i", "--interval",
+    type=click.IntRange(min=1),
+    default=DEFAULT_REFRESH_INTERVAL // 60,
+    show_default=True,
+    help="Minutes between two refreshes of the data",
+)
+@click.option(
+    "-r", "--max-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.0,
+    show_default=True,
+    help="Maximum number of pages loaded per second, lowered automatically if Steam rate limits us",
+)
+def serve_command(
+        steam_profile_url: str,
+        login: bool,
+        mode: ExportMode,
+        output: Path,
+        host: str,
+        port: int,
+        interval: int,
+        max_rate: float,
+) -> None:
+    """Serve the calendar over HTTP, and refresh it on a schedule.
+
+    The browser session is kept between the refreshes, and the calendar is
+    only rendered again when the data changes."""
+    if not login:
+        click.echo("--login is required for now, as the user game lists seems to be private")
+        return
+
+    fetch_config = FetchConfig(
+        profile_url=steam_profile_url.rstrip("/"),
+        login_user=login,
+        destination_file=output,
+        max_request_rate=max_rate,
+    )
+    config = ServeConfig(fetch=fetch_config, mode=mode, host=host, port=port, refresh_interval=interval * 60)
+    serve(config)
@@ -0,0 +1,120 @@
+"""Define the timing and counting instrumentation of the project."""
+
+import contextlib
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+
+
+@dataclass
+class Span:
+    """A timed phase of a command."""
+    # Names of the enclosing spans and of this span, joined by "/"
+    name: str
+    # Start time, in seconds since the start of the metrics
+    start: float
+    duration: float = 0.0
+    extras: Dict[str, Any] = field(default_factory=dict)
+
+    def to_json(self) -> Dict:
+        """Dump the Span to a raw data dict.
+        :return: The raw data dict
+        """
+        return dict(
+            name=self.name,
+            start=round(self.start, 6),
+            duration=round(self.duration, 6),
+            extras=self.extras,
+        )
+
+
+class Metrics:
+    """Collect timed spans and counters, if enabled.
+
+    When disabled, spans and counters cost next to nothing, so the
+    instrumentation can stay in the code.
+    """
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.started_at: datetime = datetime.now(timezone.utc)
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._origin: float = time.perf_counter()
+        self._stack: List[str] = []
+
+    def enable(self) -> None:
+        """Start collecting, from now on."""
+        self.enabled = True
+        self.started_at = datetime.now(timezone.utc)
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **extras: Any) -> Generator[Optional[Span], None, None]:
+        """Time the enclosed block.
+        :param name: The name of the phase
+        :param extras: Additional data to store with the span
+        :return: The span, to add extras to it, or None if disabled
+        """
+        if not self.enabled:
+            yield None
+            return
+        self._stack.append(name)
+        span = Span(name="/".join(self._stack), start=time.perf_counter() - self._origin, extras=extras)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - self._origin - span.start
+            self._stack.pop()
+            self.spans.append(span)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Increase a counter."""
+        if self.enabled:
+            self.counters[name] += value
+
+    def get_span_totals(self) -> Dict[str, Dict[str, float]]:
+        """Return the count, total and max duration of each span name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            total = totals.setdefault(span.name, dict(count=0, total=0.0, max=0.0))
+            total["count"] += 1
+            total["total"] += span.duration
+            total["max"] = max(total["max"], span.duration)
+        return totals
+
+    def to_json(self) -> Dict:
+        """Dump the metrics to a raw data dict.
+        :return: The raw data dict
+        """
+        return dict(
+            started_at=self.started_at.isoformat(),
+            duration=round(time.perf_counter() - self._origin, 6),
+            counters=dict(self.counters),
+            totals={
+                name: {key: round(value, 6) for key, value in total.items()}
+                for name, total in self.get_span_totals().items()
+            },
+            spans=[span.to_json() for span in sorted(self.spans, key=lambda s: s.start)],
+        )
+
+    def save(self, path: Path) -> None:
+        """Save the metrics to a JSON file."""
+        with path.open("w", encoding="utf8") as destination_file:
+            json.dump(self.to_json(), destination_file, indent=4, ensure_ascii=False)
+
+    def format_summary(self) -> List[str]:
+        """Return the lines of a human-readable summary."""
+        lines: List[str] = [f"{'Phase':40} {'Count':>6} {'Total (s)':>10} {'Max (s)':>10}"]
+        for name, total in self.get_span_totals().items():
+            lines.append(f"{name:40} {total['count']:>6} {total['total']:>10.3f} {total['max']:>10.3f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:40} {value:>6}")
+        return lines
+
+
+metrics = Metrics()
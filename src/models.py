@@ -1,8 +1,8 @@
 """Define the data models."""
 
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, List, Literal, Type, TypeVar
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional, Type, TypeVar
 
 T = TypeVar("T")
 
@@ -59,6 +59,19 @@ class Game:
     id: str
     name: str
     events: List[Event] = field(default_factory=list)
+    # Summary displayed on the game list, None when it wasn't found there
+    playtime_minutes: Optional[int] = field(default=None, compare=False)
+    unlocked_achievements: Optional[int] = field(default=None, compare=False)
+    total_achievements: Optional[int] = field(default=None, compare=False)
+
+    def may_have_unlocked_achievements(self) -> bool:
+        """Tell if the game list summary leaves a chance that some
+        achievements are unlocked. Unknown values leave a chance.
+
+        The playtime isn't used: it wasn't tracked before 2009, and offline
+        or shared play may not be counted, so no playtime doesn't mean no
+        unlocked achievements."""
+        return self.unlocked_achievements != 0 and self.total_achievements != 0
 
     @classmethod
     def from_json(cls: Type[T], raw: Dict) -> T:
@@ -70,6 +83,9 @@ class Game:
             id=raw["id"],
             name=raw["name"],
             events=[Event.from_json(raw_event) for raw_event in raw["events"]],
+            playtime_minutes=raw.get("playtime_minutes"),
+            unlocked_achievements=raw.get("unlocked_achievements"),
+            total_achievements=raw.get("total_achievements"),
         )
 
     def to_json(self) -> Dict:
@@ -80,4 +96,65 @@ class Game:
             id=self.id,
             name=self.name,
             events=[event.to_json() for event in self.events],
+            playtime_minutes=self.playtime_minutes,
+            unlocked_achievements=self.unlocked_achievements,
+            total_achievements=self.total_achievements,
+        )
+
+
+@dataclass
+class DayIndex:
+    """The number of events per day, overall and per game ID.
+
+    The index remembers the size and modification time of the data file it
+    was built from, so it can be reused as long as this file doesn't change.
+    """
+    source_mtime_ns: int
+    source_size: int
+    day_counts: Dict[date, int] = field(default_factory=dict)
+    game_day_counts: Dict[str, Dict[date, int]] = field(default_factory=dict)
+    # Names of the games, per game ID
+    game_names: Dict[str, str] = field(default_factory=dict)
+
+    def is_built_from(self, source_mtime_ns: int, source_size: int) -> bool:
+        """Tell if the index matches the given data file fingerprint.
+        :param source_mtime_ns: The modification time of the data file
+        :param source_size: The size of the data file
+        :return: Whether the index is up-to-date
+        """
+        return self.source_mtime_ns == source_mtime_ns and self.source_size == source_size
+
+    @classmethod
+    def from_json(cls: Type[T], raw: Dict) -> T:
+        """Create a new DayIndex object based on raw index data.
+        :param raw: The raw data dict
+        :return: The DayIndex object
+        """
+        return DayIndex(
+            source_mtime_ns=raw["source_mtime_ns"],
+            source_size=raw["source_size"],
+            day_counts={
+                date.fromisoformat(day): count
+                for day, count in raw["day_counts"].items()
+            },
+            game_day_counts={
+                game_id: {date.fromisoformat(day): count for day, count in counts.items()}
+                for game_id, counts in raw["game_day_counts"].items()
+            },
+            game_names=raw["game_names"],
+        )
+
+    def to_json(self) -> Dict:
+        """Dump the DayIndex to a raw data dict.
+        :return: The raw data dict
+        """
+        return dict(
+            source_mtime_ns=self.source_mtime_ns,
+            source_size=self.source_size,
+            day_counts={day.isoformat(): count for day, count in self.day_counts.items()},
+            game_day_counts={
+                game_id: {day.isoformat(): count for day, count in counts.items()}
+                for game_id, counts in self.game_day_counts.items()
+            },
+            game_names=self.game_names,
         )
@@ -1,38 +1,109 @@
 """Define the webscraping functions."""
 
 import contextlib
+import re
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright, TimeoutError, Locator
+from playwright.sync_api import sync_playwright, Browser, TimeoutError, Locator
 
 from . import exceptions
-from .config import FetchConfig, LOGIN_PAGE, LOGIN_WAIT_TIMEOUT
+from .config import FetchConfig, LOGIN_PAGE, LOGIN_WAIT_TIMEOUT, MAX_LANGUAGE_TRIES, MAX_RATE_LIMITED_TRIES
 from .logger import logger
+from .metrics import metrics
 from .models import Event, Game
+from .throttling import RateLimiter
+
+# HTTP status codes Steam answers with when we go too fast
+RATE_LIMITED_STATUSES = {429, 503}
+
+# Summaries displayed in the game rows, like "TOTAL PLAYED 1,234.5 hours"
+# and "ACHIEVEMENTS 12/45"
+PLAYTIME_REGEX = re.compile(r"total played\D*?([\d,]+(?:\.\d+)?)\s*(hours?|hrs?|minutes?|mins?)", re.IGNORECASE)
+ACHIEVEMENTS_REGEX = re.compile(r"achievements\D*?(\d+)\s*(?:/|of)\s*(\d+)", re.IGNORECASE)
 
 
 class MyWebDriver:
     """Custom wrapper for the selenium web driver."""
 
     def __init__(self, config: FetchConfig) -> None:
+        self.config = config
+        self.rate_limiter = RateLimiter(max_rate=config.max_request_rate, capacity=config.request_burst)
+        # Profile URLs Steam redirected to, to avoid the next redirections
+        self.redirected_profile_urls: Dict[str, str] = {}
+        # Names used by Steam instead of the game ID in the stats URLs, shared
+        # by all profiles
+        self.stats_names: Dict[str, str] = {}
+        # Whether the language cookie is still set to english in the context
+        self.language_cookie_set: bool = False
+
         logger.info("Start the Web driver")
+        # Playwright must be stopped whatever happens next, as only one
+        # instance can run at once in a thread
         self.pw = sync_playwright().start()
-        self.browser = self.pw.chromium.launch(headless=False)
-        self.page = self.browser.new_page()
-        # Load one page from the hostname to prepare cookies
-        self.page.goto("https://steamcommunity.com")  # TODO Too heavy, find a lighter page
-        self.config = config
+        self.browser: Optional[Browser] = None
+        try:
+            with metrics.span("browser_start"):
+                self.browser = self.pw.chromium.launch(headless=False)
+                self.page = self.browser.new_page()
+                # Load one page from the hostname to prepare cookies
+                self.goto("https://steamcommunity.com")  # TODO Too heavy, find a lighter page
 
-        if self.config.login_user:
-            self.log_in_user()
+            if self.config.login_user:
+                self.log_in_user()
+        except BaseException:
+            self.quit()
+            raise
 
     def quit(self) -> None:
         """Quit the webdriver."""
         logger.info("Quit the Web driver")
-        self.browser.close()
-        self.pw.stop()
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        finally:
+            self.pw.stop()
+
+    @property
+    def profile_url(self) -> str:
+        """The URL of the current profile, as Steam redirects to it."""
+        profile_url = self.config.profile_url.rstrip("/")
+        return self.redirected_profile_urls.get(profile_url, profile_url)
+
+    def switch_profile(self, config: FetchConfig) -> None:
+        """Fetch the next pages from another profile, in the same session."""
+        self.config = config
+
+    def goto(self, url: str) -> None:
+        """Load a page, without going faster than Steam allows.
+
+        If Steam answers that we go too fast, wait longer and longer before
+        loading the page again.
+        """
+        for try_no in range(1, MAX_RATE_LIMITED_TRIES + 1):
+            waited = self.rate_limiter.acquire()
+            if waited > 0:
+                logger.debug("Waited %.1fs before loading %s", waited, url)
+            response = self.page.goto(url)
+            metrics.incr("pages_fetched")
+            if response is None or response.status not in RATE_LIMITED_STATUSES:
+                self.rate_limiter.reward()
+                return
+            metrics.incr("rate_limited")
+            backoff = self.rate_limiter.penalize()
+            logger.warning(
+                "Steam rate limited the page %s (status %s, try %s), waiting %.0fs",
+                url, response.status, try_no, backoff,
+            )
+        raise exceptions.RateLimitedException(f"Steam kept rate limiting the page {url}")
+
+    def set_language_cookie(self) -> None:
+        """Ask Steam for english pages, which are the only ones we can parse."""
+        self.page.context.add_cookies([
+            {"name": "Steam_Language", "value": "english", "domain": ".steamcommunity.com", "path": "/"},
+        ])
+        self.language_cookie_set = True
 
     def get_page_timezone_offset(self) -> int:
         """Return the timezone offset in seconds provided by the Steam cookie."""
@@ -47,13 +118,14 @@ class MyWebDriver:
     def log_in_user(self) -> None:
         """Redirect to the login page and wait for the user to login."""
         logger.info("Go to login page")
-        self.page.goto(LOGIN_PAGE)
+        with metrics.span("login"):
+            self.goto(LOGIN_PAGE)
 
-        logger.debug("Wait for the user to login")
-        try:
-            self.page.locator(".user_avatar").wait_for(timeout=1000 * LOGIN_WAIT_TIMEOUT)
-        except TimeoutError:
-            raise exceptions.TimeoutException(f"Waited too long ({LOGIN_WAIT_TIMEOUT}s) for user login")
+            logger.debug("Wait for the user to login")
+            try:
+                self.page.locator(".user_avatar").wait_for(timeout=1000 * LOGIN_WAIT_TIMEOUT)
+            except TimeoutError:
+                raise exceptions.TimeoutException(f"Waited too long ({LOGIN_WAIT_TIMEOUT}s) for user login")
         logger.info("Logged in user detected")
 
     def get_game_list(self) -> List[Game]:
@@ -64,19 +136,36 @@ class MyWebDriver:
         """
         games_url: str = self.config.games_url()
         logger.debug("Open the page %s", games_url)
-        self.page.goto(games_url)
-
-        logger.debug("Look for game rows")
-        old_row_count: int = 0
-        while True:
-            game_rows: list[Locator] = self.page.locator(".JeLbcWPaZDg-").all()
-            game_rows_count: int = len(game_rows)
-            new_rows_count: int = game_rows_count - old_row_count
-            if new_rows_count == 0:
-                break
-            logger.debug("Found %d new games", new_rows_count)
-            self.page.press("body", "End")  # Scroll to the end of the page to load more
-            old_row_count = game_rows_count
+        with metrics.span("game_list"):
+            with metrics.span("navigation"):
+                # The summaries of the game rows are parsed in english
+                if not self.language_cookie_set:
+                    self.set_language_cookie()
+                self.goto(games_url)
+            self.remember_profile_url(self.page.url, "/games")
+
+            logger.debug("Look for game rows")
+            old_row_count: int = 0
+            with metrics.span("scroll"):
+                while True:
+                    game_rows: list[Locator] = self.page.locator(".JeLbcWPaZDg-").all()
+                    game_rows_count: int = len(game_rows)
+                    new_rows_count: int = game_rows_count - old_row_count
+                    if new_rows_count == 0:
+                        break
+                    logger.debug("Found %d new games", new_rows_count)
+                    self.page.press("body", "End")  # Scroll to the end of the page to load more
+                    old_row_count = game_rows_count
+            with metrics.span("parse"):
+                games = self._parse_game_rows(game_rows)
+
+        metrics.incr("games", len(games))
+        return games
+
+    def _parse_game_rows(self, game_rows: List[Locator]) -> List[Game]:
+        """Read the ID, the name and the summary of the games of the game
+        list page."""
+        game_rows_count: int = len(game_rows)
 
         if game_rows_count == 0:
             logger.warning(
@@ -98,8 +187,18 @@ class MyWebDriver:
             # Parse the name of the game
             game_name: str = game_title_element.text_content()
 
+            # Parse the playtime and achievements summary, if displayed
+            row_text: str = game_row.inner_text()
+            unlocked_achievements, total_achievements = understand_achievements(row_text)
+
             # Append the game to game list
-            game = Game(id=game_id, name=game_name)
+            game = Game(
+                id=game_id,
+                name=game_name,
+                playtime_minutes=understand_playtime(row_text),
+                unlocked_achievements=unlocked_achievements,
+                total_achievements=total_achievements,
+            )
             games.append(game)
 
         return games
@@ -110,25 +209,62 @@ class MyWebDriver:
         :param game_id: The Steam ID of the game
         :return: A list of achievement events
         """
-        url = self.config.achievements_url(game_id)
+        with metrics.span("achievements", game_id=game_id):
+            self._open_achievements_page(game_id)
+            with metrics.span("parse"):
+                all_events = self._parse_achievements_page()
+        metrics.incr("events", len(all_events))
+        return all_events
+
+    def remember_profile_url(self, page_url: str, separator: str) -> None:
+        """Use the profile URL Steam redirected to for the next pages.
+
+        :param page_url: The URL of the loaded page
+        :param separator: The part of the URL that follows the profile URL
+        """
+        profile_url = understand_profile_url(page_url, separator)
+        if profile_url is not None and profile_url != self.profile_url:
+            logger.debug("Use the profile URL %s instead of %s", profile_url, self.profile_url)
+            self.redirected_profile_urls[self.config.profile_url.rstrip("/")] = profile_url
+
+    def remember_stats_name(self, game_id: str, page_url: str) -> None:
+        """Remember the name Steam uses instead of the game ID in the stats URL."""
+        self.remember_profile_url(page_url, "/stats/")
+        stats_name = understand_stats_name(page_url)
+        if stats_name is not None and stats_name != game_id:
+            self.stats_names[game_id] = stats_name
+
+    def _open_achievements_page(self, game_id: str) -> None:
+        """Open the achievement page of a game, in english."""
+        # Use the URL Steam redirected to the last time, if any, because
+        # redirections change the language cookie.
+        url = self.config.achievements_url(self.stats_names.get(game_id, game_id), profile_url=self.profile_url)
         # The page must be in english to be parsed.
-        # So I set a cookie to force it in english.
-        # But if there's a redirection, the cookie is changed by the connected
-        # user language. In that case, I set again the cookie, then refresh.
-        for try_no in range(1, 6):
+        # So the language cookie is set once for the context, to force it in
+        # english. But if there's a redirection, the cookie is changed by the
+        # connected user language. In that case, I set again the cookie, then
+        # load the page Steam redirected to.
+        for try_no in range(1, MAX_LANGUAGE_TRIES + 1):
             logger.debug("Open the page %s (try %s)", url, try_no)
-            self.page.context.add_cookies([
-                {"name": "Steam_Language", "value": "english", "domain": ".steamcommunity.com", "path": "/"},
-            ])
-            self.page.goto(url)
-            lang = self.page.locator("html").first.get_attribute("lang")
+            if try_no > 1:
+                metrics.incr("language_retries")
+            with metrics.span("navigation", try_no=try_no):
+                if not self.language_cookie_set:
+                    self.set_language_cookie()
+                self.goto(url)
+                lang = self.page.locator("html").first.get_attribute("lang")
+            self.remember_stats_name(game_id, self.page.url)
             if lang == "en":
                 break
+            self.language_cookie_set = False
             url = self.page.url
         else:
             logger.warning("Couldn't load %s in english", url)
 
+    def _parse_achievements_page(self) -> List[Event]:
+        """Read the unlocked achievements of the current page."""
         text: str = self.page.content()
+        metrics.incr("bytes", len(text.encode()))
         soup = BeautifulSoup(text, "html.parser")
 
         timezone_offset: int = self.get_page_timezone_offset()
@@ -178,3 +314,55 @@ def understand_date(raw: str) -> Optional[datetime]:
         filled = parsed.replace(year=datetime.now().year)
         return filled
     return None
+
+
+def understand_playtime(raw: str) -> Optional[int]:
+    """Find the total playtime in the text of a game row.
+
+    :param raw: The text of the game row
+    :return: The playtime in minutes, or None if it isn't displayed
+    """
+    match = PLAYTIME_REGEX.search(raw)
+    if match is None:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    if match.group(2).lower().startswith("h"):
+        value *= 60
+    return round(value)
+
+
+def understand_achievements(raw: str) -> Tuple[Optional[int], Optional[int]]:
+    """Find the achievements progress in the text of a game row.
+
+    :param raw: The text of the game row
+    :return: The number of unlocked achievements and the total number of
+        achievements, or None if they aren't displayed
+    """
+    match = ACHIEVEMENTS_REGEX.search(raw)
+    if match is None:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+
+def understand_profile_url(page_url: str, separator: str) -> Optional[str]:
+    """Find the profile URL at the start of a page URL.
+
+    :param page_url: The URL of the loaded page
+    :param separator: The part of the URL that follows the profile URL
+    :return: The profile URL, or None if the page isn't one of a profile
+    """
+    profile_url, found, _ = page_url.partition(separator)
+    if not found:
+        return None
+    return profile_url
+
+
+def understand_stats_name(page_url: str) -> Optional[str]:
+    """Find the name of the game in the URL of a stats page.
+
+    :param page_url: The URL of the loaded page
+    :return: The game ID or the name Steam uses instead, or None if the page
+        isn't a stats page
+    """
+    stats_name = page_url.partition("/stats/")[2].partition("/")[0].partition("?")[0]
+    return stats_name or None
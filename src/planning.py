@@ -0,0 +1,51 @@
+"""Define the functions choosing which pages to fetch, and in which order."""
+
+from typing import Dict, List, Tuple
+
+from .config import FetchConfig
+from .logger import logger
+from .metrics import metrics
+from .models import Game
+
+# The game list of a profile
+ProfileGames = Tuple[FetchConfig, List[Game]]
+
+
+def select_games_to_parse(games: List[Game], config: FetchConfig) -> List[Game]:
+    """Return the games of a profile whose achievements will be fetched."""
+    if config.no_achievements:
+        logger.info("Skipping the achievements fetch")
+        return []
+    if config.only_achievements_for:
+        logger.info("Fetching achievements of those games : %s", config.only_achievements_for)
+        return [g for g in games if g.id in config.only_achievements_for]
+    if config.all_achievements:
+        logger.info("Fetching achievements of all games")
+        return games
+    # Don't load the pages of games that can't have unlocked achievements,
+    # according to the summary of the game list
+    selected_games = [g for g in games if g.may_have_unlocked_achievements()]
+    skipped_count = len(games) - len(selected_games)
+    metrics.incr("achievement_pages_skipped", skipped_count)
+    logger.info(
+        "Fetching achievements of %d games, skipping %d games without unlocked achievements",
+        len(selected_games), skipped_count,
+    )
+    return selected_games
+
+
+def plan_achievements_fetch(profiles: List[ProfileGames]) -> List[Tuple[FetchConfig, Game]]:
+    """Return the achievement pages to fetch, for all the profiles.
+
+    The pages of a game owned by several profiles are fetched one after the
+    other, so that the redirections learned on the first one and the
+    resources cached by the browser are reused by the next ones.
+    :param profiles: The game list of each profile
+    :return: The couples (profile, game) in the order to fetch them
+    """
+    # Insertion order keeps the games in the order they were first found
+    owners: Dict[str, List[Tuple[FetchConfig, Game]]] = {}
+    for config, games in profiles:
+        for game in select_games_to_parse(games, config):
+            owners.setdefault(game.id, []).append((config, game))
+    return [fetch for game_fetches in owners.values() for fetch in game_fetches]
@@ -0,0 +1,205 @@
+"""Define the HTTP server of the rendered calendar."""
+
+import gzip
+import hashlib
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Final, List, Optional, Tuple
+
+from .config import FetchConfig
+from .logger import logger
+from .models import Game
+from .storage import get_games_digest, load_from_file, save_to_file
+
+CALENDAR_PATHS: Final = {"/", "/index.html"}
+# Time the clients should wait before asking again for a page not rendered yet
+RETRY_AFTER: Final[int] = 60
+
+
+@dataclass(frozen=True)
+class CalendarPage:
+    """A rendered calendar, with everything needed to serve it.
+
+    The page is never modified: a refresh builds a new one and replaces the
+    served one at once, so the readers never wait for a refresh.
+    """
+    body: bytes
+    gzip_body: bytes
+    content_type: str
+    etag: str
+    # Modification time, as a timestamp in seconds
+    last_modified: int
+
+    @classmethod
+    def create(cls, rendered: str, content_type: str, last_modified: float) -> "CalendarPage":
+        """Encode and compress a rendered calendar once, for all the requests.
+        :param rendered: The rendered calendar
+        :param content_type: The MIME type of the calendar
+        :param last_modified: The time the calendar was rendered
+        :return: The CalendarPage object
+        """
+        body = rendered.encode("utf8")
+        return cls(
+            body=body,
+            gzip_body=gzip.compress(body, mtime=0),
+            content_type=f"{content_type}; charset=utf-8",
+            etag=hashlib.sha256(body).hexdigest()[:32],
+            last_modified=int(last_modified),
+        )
+
+    def is_fresh_for(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Tell if the client copy is still valid, according to its headers."""
+        if if_none_match is not None:
+            # The compressed variant has its own ETag, see get_representation
+            return any(
+                tag.strip().removeprefix("W/").strip('"').removesuffix("-gzip") == self.etag
+                for tag in if_none_match.split(",")
+            ) or if_none_match.strip() == "*"
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= self.last_modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def get_representation(self, accept_encoding: str) -> Tuple[bytes, Optional[str], str]:
+        """Return the body, its encoding and its ETag for a client."""
+        if "gzip" in accept_encoding:
+            return self.gzip_body, "gzip", f'"{self.etag}-gzip"'
+        return self.body, None, f'"{self.etag}"'
+
+
+class CalendarPublisher:
+    """Save and render the fetched games, only when they changed.
+
+    A refresh that returns no games, or no events while the last data had
+    some, most likely failed (expired login, private profile, Steam
+    hiccup...). It is ignored, so the last good data stays saved and served.
+    """
+
+    def __init__(self, render: Callable[[List[Game]], CalendarPage], set_page: Callable[[CalendarPage], None]) -> None:
+        """
+        :param render: Render games into a page, raise ValueError if there's
+            nothing to render
+        :param set_page: Serve a page from now on
+        """
+        self.render = render
+        self.set_page = set_page
+        # Hash and event count of the last saved or loaded data
+        self.last_digest: Optional[str] = None
+        self.last_event_count: int = 0
+
+    def publish_saved(self, data_file: Path) -> None:
+        """Serve the data of the last run, while the first refresh happens."""
+        games = load_from_file(data_file)
+        self.publish(games, get_games_digest(games))
+
+    def on_profile_fetched(self, config: FetchConfig, games: List[Game]) -> None:
+        """Save and render the fetched games, unless they didn't change or
+        look like a failed refresh."""
+        event_count = sum(len(game.events) for game in games)
+        if not games:
+            logger.warning("The refresh found no games, keep serving the last data")
+            return
+        if event_count == 0 and self.last_event_count > 0:
+            logger.warning("The refresh found no events, keep serving the last data")
+            return
+
+        digest = get_games_digest(games)
+        if digest == self.last_digest:
+            logger.info("The data didn't change, keep serving the same calendar")
+            return
+        save_to_file(games, config=config)
+        self.publish(games, digest)
+
+    def publish(self, games: List[Game], digest: str) -> None:
+        """Render the games and serve them from now on."""
+        # Count before rendering, which may modify the events
+        event_count = sum(len(game.events) for game in games)
+        self.last_digest = digest
+        self.last_event_count = event_count
+        try:
+            page = self.render(games)
+        except ValueError as err:
+            logger.warning("Nothing to serve: %s", err)
+            return
+        self.set_page(page)
+
+
+class CalendarServer(ThreadingHTTPServer):
+    """HTTP server of the last rendered calendar."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int]) -> None:
+        super().__init__(address, CalendarRequestHandler)
+        self.page: Optional[CalendarPage] = None
+
+    def set_page(self, page: CalendarPage) -> None:
+        """Serve a new calendar from now on."""
+        self.page = page
+
+    def start_in_thread(self) -> threading.Thread:
+        """Serve the requests in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name="calendar-server", daemon=True)
+        thread.start()
+        logger.info("Serving the calendar on http://%s:%s/", *self.server_address[:2])
+        return thread
+
+
+class CalendarRequestHandler(BaseHTTPRequestHandler):
+    """Answer the requests with the calendar of the server."""
+
+    server: CalendarServer
+
+    def do_HEAD(self) -> None:
+        self.send_calendar(with_body=False)
+
+    def do_GET(self) -> None:
+        self.send_calendar(with_body=True)
+
+    def send_calendar(self, with_body: bool) -> None:
+        """Send the calendar, or only tell the client its copy is valid."""
+        if self.path.partition("?")[0] not in CALENDAR_PATHS:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        # Take the page once, as a refresh may replace it meanwhile
+        page = self.server.page
+        if page is None:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header("Retry-After", str(RETRY_AFTER))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, encoding, etag = page.get_representation(self.headers.get("Accept-Encoding", ""))
+        if page.is_fresh_for(self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_caching_headers(page, etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", page.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_caching_headers(page, etag)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def send_caching_headers(self, page: CalendarPage, etag: str) -> None:
+        """Let the clients keep the page, but check it before using it."""
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(page.last_modified, usegmt=True))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
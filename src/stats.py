@@ -0,0 +1,131 @@
+"""Define the functions to aggregate the events into summaries."""
+
+from collections import Counter, defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .config import StatsPeriod
+from .logger import logger
+from .metrics import metrics
+from .models import DayIndex, Game
+from .storage import get_index_path, load_day_index, load_from_file, save_day_index
+
+
+def build_day_index(games: List[Game], source_mtime_ns: int = 0, source_size: int = 0) -> DayIndex:
+    """Count the events of every day, overall and per game ID, in one pass.
+    :param games: The list of games and events to count
+    :param source_mtime_ns: The modification time of the data file
+    :param source_size: The size of the data file
+    :return: The day index
+    """
+    day_counts: Dict[date, int] = defaultdict(int)
+    game_day_counts: Dict[str, Dict[date, int]] = defaultdict(lambda: defaultdict(int))
+
+    for game in games:
+        for event in game.events:
+            # Use the local timezone, like the calendar does
+            day: date = event.date.astimezone(tz=None).date()
+            day_counts[day] += 1
+            game_day_counts[game.id][day] += 1
+
+    return DayIndex(
+        source_mtime_ns=source_mtime_ns,
+        source_size=source_size,
+        day_counts=dict(sorted(day_counts.items())),
+        game_day_counts={
+            game_id: dict(sorted(counts.items()))
+            for game_id, counts in game_day_counts.items()
+        },
+        game_names={game.id: game.name for game in games if game.id in game_day_counts},
+    )
+
+
+def get_day_index(data_file: Path) -> DayIndex:
+    """Return the day index of a data file.
+
+    The index saved next to the data file is reused if it's up-to-date.
+    Otherwise, the data file is loaded, and the index is built and saved.
+    :param data_file: The path of the data file
+    :return: The day index
+    """
+    stat = data_file.stat()
+    index_file: Path = get_index_path(data_file)
+
+    with metrics.span("index_load"):
+        index = load_day_index(index_file)
+    if index is not None and index.is_built_from(stat.st_mtime_ns, stat.st_size):
+        return index
+
+    logger.info("Build the day index of %s", data_file)
+    games = load_from_file(data_file)
+    with metrics.span("index_build"):
+        index = build_day_index(games, source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+    try:
+        save_day_index(index, index_file)
+    except OSError as err:
+        logger.warning("Couldn't save the day index to %s (%s)", index_file, err)
+    return index
+
+
+def period_key(day: date, period: StatsPeriod) -> str:
+    """Return the label of the period containing a day ("2022-09" or "2022")."""
+    if period == "year":
+        return f"{day.year}"
+    return f"{day.year}-{day.month:02}"
+
+
+def get_period_totals(index: DayIndex, period: StatsPeriod) -> Dict[str, int]:
+    """Return the number of events per period, in chronological order."""
+    totals: Dict[str, int] = defaultdict(int)
+    for day, count in index.day_counts.items():
+        totals[period_key(day, period)] += count
+    return dict(sorted(totals.items()))
+
+
+def get_top_games(index: DayIndex, period: StatsPeriod, limit: int) -> Dict[str, List[Tuple[str, int]]]:
+    """Return the games with the most events per period.
+    :param index: The day index
+    :param period: The length of the periods
+    :param limit: The maximum number of games to return per period
+    :return: The (game name, event count) couples of each period, the most
+        active game first. Games with the same name are kept apart.
+    """
+    counters: Dict[str, Counter] = defaultdict(Counter)
+    for game_id, counts in index.game_day_counts.items():
+        for day, count in counts.items():
+            counters[period_key(day, period)][game_id] += count
+    return {
+        key: sorted(
+            ((index.game_names.get(game_id, game_id), count) for game_id, count in counter.items()),
+            key=lambda item: (-item[1], item[0]),
+        )[:limit]
+        for key, counter in sorted(counters.items())
+    }
+
+
+def get_most_active_day(index: DayIndex) -> Tuple[date, int]:
+    """Return the day with the most events, and its number of events."""
+    return max(index.day_counts.items(), key=lambda item: (item[1], item[0]))
+
+
+def format_stats(index: DayIndex, period: StatsPeriod, limit: int) -> List[str]:
+    """Return the lines of the summary to display."""
+    if not index.day_counts:
+        raise ValueError("There's no data to display")
+
+    totals = get_period_totals(index, period)
+    top_games = get_top_games(index, period, limit)
+    busiest_day, busiest_count = get_most_active_day(index)
+
+    lines: List[str] = [
+        f"Events: {sum(totals.values())}",
+        f"Active days: {len(index.day_counts)}",
+        f"Most active day: {busiest_day.isoformat()} ({busiest_count} events)",
+        "",
+    ]
+    for key, total in totals.items():
+        lines.append(f"----- {key} ----- {total} events")
+        for game_name, count in top_games[key]:
+            lines.append(f"  {count:>5}  {game_name}")
+    return lines
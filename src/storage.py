@@ -1,31 +1,70 @@
 """Define the games data storage functions."""
 
+import hashlib
 import json
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from .config import FetchConfig
 from .logger import logger
-from .models import Game
+from .metrics import metrics
+from .models import DayIndex, Game
 
 
 def save_to_file(games: List[Game], config: FetchConfig) -> None:
     """Save the game data to a file."""
     logger.info("Dump output to %s", config.destination_file)
-    with config.destination_file.open("w", encoding="utf8") as destination_file:
+    with metrics.span("save"), config.destination_file.open("w", encoding="utf8") as destination_file:
         output_json = [game.to_json() for game in games]
         json.dump(output_json, destination_file, indent=4, ensure_ascii=False)
 
 
+def get_games_digest(games: List[Game]) -> str:
+    """Return a hash of the game data, to know if it changed."""
+    output_json = [game.to_json() for game in games]
+    return hashlib.sha256(json.dumps(output_json, sort_keys=True).encode()).hexdigest()
+
+
 def load_from_file(path: Path) -> List[Game]:
     """Load the data from a file."""
     logger.info("Load data from %s", path)
-    with path.open(encoding="utf8") as source_file:
-        loaded_data = json.load(source_file)
+    with metrics.span("load"):
+        with path.open(encoding="utf8") as source_file:
+            loaded_data = json.load(source_file)
 
-    output: List[Game] = []
-    for game_data in loaded_data:
-        game = Game.from_json(game_data)
-        output.append(game)
+        output: List[Game] = []
+        for game_data in loaded_data:
+            game = Game.from_json(game_data)
+            output.append(game)
 
+    metrics.incr("games", len(output))
+    metrics.incr("events", sum(len(game.events) for game in output))
     return output
+
+
+def get_index_path(data_file: Path) -> Path:
+    """Return the path of the day index saved next to a data file."""
+    return data_file.with_name(f"{data_file.stem}.index.json")
+
+
+def save_day_index(index: DayIndex, path: Path) -> None:
+    """Save the day index to a file."""
+    logger.info("Dump day index to %s", path)
+    with path.open("w", encoding="utf8") as destination_file:
+        json.dump(index.to_json(), destination_file, ensure_ascii=False)
+
+
+def load_day_index(path: Path) -> Optional[DayIndex]:
+    """Load the day index from a file.
+
+    :return: The day index, or None if the file is missing or unreadable
+    """
+    if not path.is_file():
+        return None
+    logger.info("Load day index from %s", path)
+    try:
+        with path.open(encoding="utf8") as source_file:
+            return DayIndex.from_json(json.load(source_file))
+    except (ValueError, KeyError, TypeError, AttributeError) as err:
+        logger.warning("Ignoring the unreadable day index %s (%s)", path, err)
+        return None
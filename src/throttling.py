@@ -0,0 +1,81 @@
+"""Define the rate limiter shared by the requests sent to Steam."""
+
+import time
+from typing import Callable, Final
+
+# Lowest rate the limiter can be slowed down to, in requests per second
+MIN_RATE: Final[float] = 0.05
+# Longest wait after being rate limited, in seconds
+MAX_BACKOFF: Final[float] = 120.0
+
+
+class RateLimiter:
+    """Token bucket with an adaptive rate.
+
+    Each request takes a token. The tokens come back at `rate` per second, up
+    to `capacity` tokens, which allows short bursts. When Steam answers that
+    we go too fast, the rate is halved and the next request waits for an
+    increasing backoff. Each successful request then brings the rate back up
+    a bit, until it reaches `max_rate` again.
+    """
+
+    def __init__(
+            self,
+            max_rate: float,
+            capacity: int = 1,
+            base_backoff: float = 5.0,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_rate: float = max_rate
+        self.rate: float = max_rate
+        self.capacity: int = capacity
+        self.base_backoff: float = base_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens: float = capacity
+        self.consecutive_penalties: int = 0
+        self._last_refill: float = clock()
+        self._resume_at: float = 0.0
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """Wait until a request can be sent, and take a token.
+        :return: The time spent waiting, in seconds
+        """
+        waited: float = 0.0
+        # Wait for the end of the backoff
+        delay = self._resume_at - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+            waited += delay
+        self._refill()
+        if self.tokens < 1:
+            delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+            self._refill()
+        self.tokens -= 1
+        return waited
+
+    def penalize(self) -> float:
+        """Slow down after being rate limited.
+        :return: The backoff before the next request, in seconds
+        """
+        self.consecutive_penalties += 1
+        self.rate = max(MIN_RATE, self.rate / 2)
+        backoff = min(MAX_BACKOFF, self.base_backoff * 2 ** (self.consecutive_penalties - 1))
+        self._resume_at = self.clock() + backoff
+        # Only one request is allowed right after the backoff, not a burst
+        self.tokens = 1
+        self._last_refill = self._resume_at
+        return backoff
+
+    def reward(self) -> None:
+        """Speed up again after a successful request."""
+        self.consecutive_penalties = 0
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
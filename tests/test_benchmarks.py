@@ -0,0 +1,28 @@
+from benchmarks.run import compare_to_baseline, get_results_key
+from benchmarks.synthetic import generate_games
+
+
+def test_generate_games():
+    games = generate_games(game_count=10, event_count=500, day_spread=30)
+    assert len(games) == 10
+    dates = [event.date for game in games for event in game.events]
+    assert len(dates) == 500
+    assert (max(dates) - min(dates)).days < 30
+    assert generate_games(10, 500, day_spread=30) == games, "The generator isn't reproducible"
+
+
+def test_compare_to_baseline():
+    baseline = {"small@1825d": {"load_from_file": dict(seconds=1.0, peak_bytes=1000)}}
+    results = {"small@1825d": {
+        "load_from_file": dict(seconds=1.4, peak_bytes=1300),
+        "save_to_file": dict(seconds=10.0, peak_bytes=10000),
+    }}
+    regressions = compare_to_baseline(results, baseline, time_tolerance=0.5, memory_tolerance=0.2)
+    assert regressions == ["small@1825d/load_from_file: peak_bytes went from 1000 to 1300 (more than +20%)"]
+
+
+def test_compare_to_baseline_ignores_other_data_sets():
+    assert get_results_key("small", 1825) == "small@1825d"
+    baseline = {"small@1825d": {"load_from_file": dict(seconds=1.0, peak_bytes=1000)}}
+    results = {"small@7300d": {"load_from_file": dict(seconds=4.0, peak_bytes=4000)}}
+    assert compare_to_baseline(results, baseline, time_tolerance=0.5, memory_tolerance=0.2) == []
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+from typing import Set
+
+import pytest
+
+from src.config import ROOT_PATH
+
+HEAVY_MODULES = {"playwright", "bs4", "jinja2"}
+
+
+def get_imported_modules(*args: str) -> Set[str]:
+    """Run the CLI with `python -X importtime` and return the top-level
+    modules it imported."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "stc.py", *args],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Each line looks like "import time:   self [us] | cumulative | imported package"
+    modules: Set[str] = set()
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            module = line.rpartition("|")[2].strip()
+            modules.add(module.partition(".")[0])
+    return modules
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "dump.json"
+    event = dict(type="achievement", date="2022-09-16T12:00:00+00:00", extras=dict(title="Title", desc="Desc"))
+    path.write_text(json.dumps([dict(id="1", name="Game", events=[event])]))
+    return path
+
+
+def test_help_imports_no_heavy_module():
+    assert get_imported_modules("--help").isdisjoint(HEAVY_MODULES)
+
+
+def test_draw_text_imports_no_heavy_module(data_file, tmp_path):
+    modules = get_imported_modules("draw", "-m", "text", "-f", str(data_file), "-o", str(tmp_path / "cal.txt"))
+    assert modules.isdisjoint(HEAVY_MODULES)
+
+
+def test_draw_html_only_imports_jinja(data_file, tmp_path):
+    modules = get_imported_modules("draw", "-f", str(data_file), "-o", str(tmp_path / "cal.html"))
+    assert modules & HEAVY_MODULES == {"jinja2"}
+
+
+def test_stats_imports_no_heavy_module(data_file):
+    assert get_imported_modules("stats", "-f", str(data_file)).isdisjoint(HEAVY_MODULES)
@@ -0,0 +1,30 @@
+from src.metrics import Metrics
+
+
+def test_disabled_metrics_collect_nothing():
+    metrics = Metrics()
+    with metrics.span("load") as span:
+        metrics.incr("events", 3)
+    assert span is None
+    assert metrics.spans == []
+    assert metrics.counters == {}
+
+
+def test_nested_spans_and_counters():
+    metrics = Metrics()
+    metrics.enable()
+    for game_id in ("1", "2"):
+        with metrics.span("achievements", game_id=game_id):
+            with metrics.span("navigation"):
+                metrics.incr("pages_fetched")
+    metrics.incr("events", 3)
+
+    output = metrics.to_json()
+    assert output["counters"] == {"pages_fetched": 2, "events": 3}
+    assert [span["name"] for span in output["spans"]] == [
+        "achievements", "achievements/navigation", "achievements", "achievements/navigation",
+    ]
+    assert output["spans"][2]["extras"] == {"game_id": "2"}
+    assert output["totals"]["achievements/navigation"]["count"] == 2
+    total = output["totals"]["achievements"]
+    assert total["max"] <= total["total"] <= output["duration"]
@@ -1,11 +1,22 @@
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import pytest
+from playwright.sync_api import Error as PlaywrightError
 
+from src import parsing
 from src.config import FetchConfig
 from src.models import Event, Game
-from src.parsing import MyWebDriver
+from src.parsing import (
+    MyWebDriver,
+    understand_achievements,
+    understand_playtime,
+    understand_profile_url,
+    understand_stats_name,
+)
+
+PROFILE_URL = "https://steamcommunity.com/id/Lial_Slasher"
+REDIRECTED_PROFILE_URL = "https://steamcommunity.com/profiles/76561198000000000"
 
 
 @pytest.fixture
@@ -46,3 +57,238 @@ def test_get_achievements_events(webdriver: MyWebDriver) -> None:
 def test_get_achievements_events_dates() -> None:
     # TODO
     pass
+
+
+@pytest.mark.parametrize(
+    "raw,expected", [
+        ("A Hat in Time\nTOTAL PLAYED\n1,234.5 hours\nACHIEVEMENTS\n45/45", 74070),
+        ("DEATHLOOP\nTotal played: 25 minutes", 25),
+        ("Team Fortress 2\nStore Page", None),
+    ]
+)
+def test_understand_playtime(raw: str, expected: Optional[int]) -> None:
+    assert understand_playtime(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "raw,expected", [
+        ("A Hat in Time\nTOTAL PLAYED\n12 hours\nACHIEVEMENTS\n12/45", (12, 45)),
+        ("DEATHLOOP\nAchievements 0 / 38", (0, 38)),
+        ("Team Fortress 2\nTOTAL PLAYED\n12 hours", (None, None)),
+    ]
+)
+def test_understand_achievements(raw: str, expected) -> None:
+    assert understand_achievements(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "page_url,separator,expected", [
+        (f"{PROFILE_URL}/games/?tab=all", "/games", PROFILE_URL),
+        (f"{REDIRECTED_PROFILE_URL}/stats/TF2/?tab=achievements", "/stats/", REDIRECTED_PROFILE_URL),
+        ("https://steamcommunity.com/login/home/", "/stats/", None),
+    ]
+)
+def test_understand_profile_url(page_url: str, separator: str, expected: Optional[str]) -> None:
+    assert understand_profile_url(page_url, separator) == expected
+
+
+@pytest.mark.parametrize(
+    "page_url,expected", [
+        (f"{PROFILE_URL}/stats/TF2/?tab=achievements", "TF2"),
+        (f"{PROFILE_URL}/stats/253230?tab=achievements", "253230"),
+        (f"{PROFILE_URL}/", None),
+    ]
+)
+def test_understand_stats_name(page_url: str, expected: Optional[str]) -> None:
+    assert understand_stats_name(page_url) == expected
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakeLocator:
+    def __init__(self, page: "FakePage") -> None:
+        self.first = self
+        self.page = page
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self.page.lang
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.added_cookies: List[Dict] = []
+
+    def add_cookies(self, cookies: List[Dict]) -> None:
+        self.added_cookies.extend(cookies)
+
+
+class FakePage:
+    """Page loading the URLs Steam would redirect to, in the given language."""
+
+    def __init__(self, redirections: Dict[str, Tuple[str, str]]) -> None:
+        # Requested URL -> (loaded URL, page language), used once each
+        self.redirections = redirections
+        self.context = FakeContext()
+        self.url = "about:blank"
+        self.lang = "en"
+        self.visited: List[str] = []
+
+    def goto(self, url: str) -> FakeResponse:
+        self.visited.append(url)
+        self.url, self.lang = self.redirections.pop(url, (url, "en"))
+        return FakeResponse()
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(self)
+
+
+class FakeBrowser:
+    def __init__(self, page: FakePage, close_error: Optional[Exception]) -> None:
+        self.page = page
+        self.close_error = close_error
+
+    def new_page(self) -> FakePage:
+        return self.page
+
+    def close(self) -> None:
+        if self.close_error is not None:
+            raise self.close_error
+
+
+class FakeSyncPlaywright:
+    """Stand-in for sync_playwright, launching browsers with a FakePage."""
+
+    def __init__(self, page: FakePage) -> None:
+        self.page = page
+        # Errors raised by the next launches and closings of a browser
+        self.launch_errors: List[Exception] = []
+        self.close_errors: List[Exception] = []
+        self.instances: List["FakePlaywright"] = []
+
+    def __call__(self) -> "FakePlaywright":
+        return FakePlaywright(self)
+
+
+class FakePlaywright:
+    def __init__(self, factory: FakeSyncPlaywright) -> None:
+        self.chromium = self
+        self.factory = factory
+        self.running = False
+
+    def start(self) -> "FakePlaywright":
+        # Like Playwright, refuse to run twice at once in the same thread
+        if any(instance.running for instance in self.factory.instances):
+            raise PlaywrightError("It looks like you are using Playwright Sync API inside the asyncio loop.")
+        self.factory.instances.append(self)
+        self.running = True
+        return self
+
+    def launch(self, headless: bool) -> FakeBrowser:
+        if self.factory.launch_errors:
+            raise self.factory.launch_errors.pop(0)
+        close_error = self.factory.close_errors.pop(0) if self.factory.close_errors else None
+        return FakeBrowser(self.factory.page, close_error)
+
+    def stop(self) -> None:
+        self.running = False
+
+
+@pytest.fixture
+def fake_sync_playwright(monkeypatch) -> FakeSyncPlaywright:
+    factory = FakeSyncPlaywright(FakePage(redirections={}))
+    monkeypatch.setattr(parsing, "sync_playwright", factory)
+    return factory
+
+
+@pytest.fixture
+def fake_page(fake_sync_playwright: FakeSyncPlaywright) -> FakePage:
+    return fake_sync_playwright.page
+
+
+@pytest.fixture
+def fake_config() -> FetchConfig:
+    return FetchConfig(profile_url=f"{PROFILE_URL}/", max_request_rate=1000, request_burst=100)
+
+
+@pytest.fixture
+def fake_webdriver(fake_page: FakePage, fake_config: FetchConfig) -> MyWebDriver:
+    wd = MyWebDriver(config=fake_config)
+    yield wd
+    wd.quit()
+
+
+def test_webdriver_stops_playwright_after_failed_start(
+        fake_sync_playwright: FakeSyncPlaywright,
+        fake_config: FetchConfig,
+) -> None:
+    fake_sync_playwright.launch_errors.append(PlaywrightError("Executable doesn't exist"))
+    with pytest.raises(PlaywrightError):
+        MyWebDriver(config=fake_config)
+
+    wd = MyWebDriver(config=fake_config)
+    assert fake_sync_playwright.page.visited == ["https://steamcommunity.com"]
+    wd.quit()
+    assert not any(instance.running for instance in fake_sync_playwright.instances)
+
+
+def test_webdriver_stops_playwright_after_failed_close(
+        fake_sync_playwright: FakeSyncPlaywright,
+        fake_config: FetchConfig,
+) -> None:
+    fake_sync_playwright.close_errors.append(PlaywrightError("Target closed"))
+    wd = MyWebDriver(config=fake_config)
+    with pytest.raises(PlaywrightError):
+        wd.quit()
+
+    MyWebDriver(config=fake_config).quit()
+    assert not any(instance.running for instance in fake_sync_playwright.instances)
+
+
+def test_achievements_page_of_tf2(fake_webdriver: MyWebDriver, fake_page: FakePage) -> None:
+    fake_webdriver._open_achievements_page("440")
+    assert fake_page.visited[-1] == f"{PROFILE_URL}/stats/TF2/?tab=achievements"
+    # Steam doesn't redirect, so there's nothing to remember
+    assert fake_webdriver.redirected_profile_urls == {}
+    assert fake_webdriver.stats_names == {"440": "TF2"}
+
+
+def test_achievements_page_redirected_to_profiles_url(fake_webdriver: MyWebDriver, fake_page: FakePage) -> None:
+    fake_page.redirections[f"{PROFILE_URL}/stats/253230/?tab=achievements"] = (
+        f"{REDIRECTED_PROFILE_URL}/stats/AHatInTime/?tab=achievements", "en",
+    )
+    fake_webdriver._open_achievements_page("253230")
+    assert fake_webdriver.profile_url == REDIRECTED_PROFILE_URL
+    assert fake_webdriver.stats_names == {"253230": "AHatInTime"}
+
+    # The next pages are loaded from the redirected URLs at once
+    fake_webdriver._open_achievements_page("253230")
+    assert fake_page.visited[-1] == f"{REDIRECTED_PROFILE_URL}/stats/AHatInTime/?tab=achievements"
+
+
+def test_achievements_page_redirected_out_of_stats(fake_webdriver: MyWebDriver, fake_page: FakePage) -> None:
+    fake_page.redirections[f"{PROFILE_URL}/stats/253230/?tab=achievements"] = (
+        "https://steamcommunity.com/login/home/?goto=", "en",
+    )
+    fake_webdriver._open_achievements_page("253230")
+    assert fake_webdriver.redirected_profile_urls == {}
+    assert fake_webdriver.stats_names == {}
+    assert fake_webdriver.profile_url == PROFILE_URL
+
+
+def test_language_cookie_set_again_after_non_english_page(
+        fake_webdriver: MyWebDriver,
+        fake_page: FakePage,
+) -> None:
+    url = f"{PROFILE_URL}/stats/253230/?tab=achievements"
+    fake_page.redirections[url] = (f"{url}&l=french", "fr")
+    fake_webdriver._open_achievements_page("253230")
+    # Set once before the first page, then again after the french one
+    assert len(fake_page.context.added_cookies) == 2
+    assert fake_page.visited[-2:] == [url, f"{url}&l=french"]
+    assert fake_webdriver.language_cookie_set
+
+    # An english page keeps the cookie as it is
+    fake_webdriver._open_achievements_page("253230")
+    assert len(fake_page.context.added_cookies) == 2
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+
+from src.config import FetchConfig, get_profile_data_file, get_profile_name, read_profiles_file
+from src.models import Game
+from src.planning import plan_achievements_fetch, select_games_to_parse
+
+
+def make_games(*game_ids: str):
+    return [Game(id=game_id, name=f"Game {game_id}") for game_id in game_ids]
+
+
+def test_select_games_to_parse():
+    games = make_games("1", "2", "3")
+    assert select_games_to_parse(games, FetchConfig(profile_url="a")) == games
+    assert select_games_to_parse(games, FetchConfig(profile_url="a", no_achievements=True)) == []
+    only = FetchConfig(profile_url="a", only_achievements_for=("2",))
+    assert select_games_to_parse(games, only) == [games[1]]
+
+
+def test_select_games_to_parse_skips_games_without_unlocked_achievements():
+    games = [
+        Game(id="1", name="Unknown summary"),
+        Game(id="2", name="Never played", playtime_minutes=0),
+        Game(id="3", name="No unlocked achievements", playtime_minutes=120, unlocked_achievements=0, total_achievements=45),
+        Game(id="4", name="No achievements", playtime_minutes=120, total_achievements=0),
+        Game(id="5", name="Unlocked achievements", playtime_minutes=120, unlocked_achievements=3, total_achievements=45),
+        Game(id="6", name="Played", playtime_minutes=120),
+    ]
+    selected = select_games_to_parse(games, FetchConfig(profile_url="a"))
+    assert [game.id for game in selected] == ["1", "2", "5", "6"]
+    assert select_games_to_parse(games, FetchConfig(profile_url="a", all_achievements=True)) == games
+    only = FetchConfig(profile_url="a", only_achievements_for=("2",))
+    assert select_games_to_parse(games, only) == [games[1]]
+
+
+def test_plan_achievements_fetch_groups_shared_games():
+    alice = FetchConfig(profile_url="alice")
+    bob = FetchConfig(profile_url="bob", only_achievements_for=("2", "3", "4"))
+    carol = FetchConfig(profile_url="carol")
+    plan = plan_achievements_fetch([
+        (alice, make_games("1", "2", "3")),
+        (bob, make_games("2", "3", "4")),
+        (carol, make_games("3")),
+    ])
+    assert [(config.profile_url, game.id) for config, game in plan] == [
+        ("alice", "1"),
+        ("alice", "2"), ("bob", "2"),
+        ("alice", "3"), ("bob", "3"), ("carol", "3"),
+        ("bob", "4"),
+    ]
+
+
+def test_profile_files(tmp_path):
+    profiles_file = tmp_path / "profiles.txt"
+    profiles_file.write_text("# Friends\nhttps://steamcommunity.com/id/alice/\n\n  https://steamcommunity.com/profiles/7656  \n")
+    assert read_profiles_file(profiles_file) == [
+        "https://steamcommunity.com/id/alice/",
+        "https://steamcommunity.com/profiles/7656",
+    ]
+    assert get_profile_data_file(Path("out/dump.json"), "https://steamcommunity.com/id/alice/") == Path("out/dump-alice.json")
+
+
+@pytest.mark.parametrize(
+    "profile_url,expected", [
+        ("https://steamcommunity.com/id/alice/", "alice"),
+        ("https://steamcommunity.com/id/alice/?l=english", "alice"),
+        ("https://steamcommunity.com/profiles/76561198000000000/games/#top", "76561198000000000"),
+        ("steamcommunity.com/id/bob", "bob"),
+    ]
+)
+def test_get_profile_name(profile_url, expected):
+    assert get_profile_name(profile_url) == expected
@@ -0,0 +1,195 @@
+import dataclasses
+import gzip
+import http.client
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import List, Optional
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from src.config import FetchConfig
+from src.exceptions import TimeoutException
+from src.main import refresh_forever
+from src.models import Event, Game
+from src.serving import CalendarPage, CalendarPublisher, CalendarServer
+from src.storage import load_from_file, save_to_file
+
+
+@pytest.fixture
+def server():
+    calendar_server = CalendarServer(("127.0.0.1", 0))
+    calendar_server.start_in_thread()
+    yield calendar_server
+    calendar_server.shutdown()
+    calendar_server.server_close()
+
+
+def request(server: CalendarServer, path: str = "/", **headers: str) -> http.client.HTTPResponse:
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    connection.request("GET", path, headers={key.replace("_", "-"): value for key, value in headers.items()})
+    response = connection.getresponse()
+    response.body = response.read()
+    connection.close()
+    return response
+
+
+def test_serve_before_first_render(server):
+    response = request(server)
+    assert response.status == 503
+    assert response.getheader("Retry-After") is not None
+    assert request(server, "/other").status == 404
+
+
+def test_serve_with_cache_validation(server):
+    server.set_page(CalendarPage.create("<html>Calendar</html>", "text/html", last_modified=1_000_000))
+
+    response = request(server)
+    assert response.status == 200
+    assert response.body == b"<html>Calendar</html>"
+    etag = response.getheader("ETag")
+    assert response.getheader("Last-Modified") == formatdate(1_000_000, usegmt=True)
+
+    assert request(server, If_None_Match=etag).status == 304
+    assert request(server, If_Modified_Since=formatdate(1_000_000, usegmt=True)).status == 304
+    assert request(server, If_Modified_Since=formatdate(999_999, usegmt=True)).status == 200
+
+    # A refresh replaces the page, so the old copies aren't valid anymore
+    server.set_page(CalendarPage.create("<html>New calendar</html>", "text/html", last_modified=2_000_000))
+    response = request(server, If_None_Match=etag)
+    assert response.status == 200
+    assert response.body == b"<html>New calendar</html>"
+
+
+def test_serve_gzip(server):
+    server.set_page(CalendarPage.create("<html>Calendar</html>", "text/html", last_modified=1_000_000))
+    response = request(server, Accept_Encoding="gzip, deflate")
+    assert response.status == 200
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(response.body) == b"<html>Calendar</html>"
+    assert request(server, Accept_Encoding="gzip", If_None_Match=response.getheader("ETag")).status == 304
+
+
+class FakeServer:
+    """Render the games as their names, and remember the served pages."""
+
+    def __init__(self) -> None:
+        self.pages: List[CalendarPage] = []
+
+    def render(self, games: List[Game]) -> CalendarPage:
+        if not any(game.events for game in games):
+            raise ValueError("There's no data to display")
+        return CalendarPage.create(",".join(game.name for game in games), "text/plain", last_modified=0)
+
+    def set_page(self, page: CalendarPage) -> None:
+        self.pages.append(page)
+
+
+def fake_fetch(*event_counts: int) -> List[Game]:
+    """Return the games a refresh would find, with some events each."""
+    event_date = datetime(2022, 9, 16, tzinfo=timezone.utc)
+    return [
+        Game(
+            id=str(game_no),
+            name=f"Game {game_no}",
+            events=[Event.create_achievement_event(event_date, title="Title", desc="Desc")] * event_count,
+        )
+        for game_no, event_count in enumerate(event_counts)
+    ]
+
+
+@pytest.fixture
+def fetch_config(tmp_path):
+    config = FetchConfig(profile_url="https://steamcommunity.com/id/alice", destination_file=tmp_path / "dump.json")
+    save_to_file(fake_fetch(1, 2), config=config)
+    return config
+
+
+def make_publisher(fetch_config: FetchConfig, fake_server: FakeServer) -> CalendarPublisher:
+    publisher = CalendarPublisher(render=fake_server.render, set_page=fake_server.set_page)
+    publisher.publish_saved(fetch_config.destination_file)
+    return publisher
+
+
+def test_publisher_skips_unchanged_data(fetch_config):
+    fake_server = FakeServer()
+    publisher = make_publisher(fetch_config, fake_server)
+    assert len(fake_server.pages) == 1
+
+    fetch_config.destination_file.unlink()
+    publisher.on_profile_fetched(fetch_config, fake_fetch(1, 2))
+    assert len(fake_server.pages) == 1, "The unchanged data was rendered again"
+    assert not fetch_config.destination_file.exists(), "The unchanged data was saved again"
+
+
+def test_publisher_saves_and_renders_changed_data(fetch_config):
+    fake_server = FakeServer()
+    publisher = make_publisher(fetch_config, fake_server)
+
+    publisher.on_profile_fetched(fetch_config, fake_fetch(1, 2, 3))
+    assert len(fake_server.pages) == 2
+    assert fake_server.pages[-1].body == b"Game 0,Game 1,Game 2"
+    assert len(load_from_file(fetch_config.destination_file)) == 3
+
+
+@pytest.mark.parametrize("event_counts", [(), (0, 0)])
+def test_publisher_keeps_last_data_after_empty_refresh(fetch_config, event_counts):
+    fake_server = FakeServer()
+    publisher = make_publisher(fetch_config, fake_server)
+
+    publisher.on_profile_fetched(fetch_config, fake_fetch(*event_counts))
+    assert len(fake_server.pages) == 1
+    assert [len(game.events) for game in load_from_file(fetch_config.destination_file)] == [1, 2]
+
+
+class FakeDriver:
+    """Web driver finding some games, or failing like a dead browser."""
+
+    def __init__(self, games: List[Game], error: Optional[Exception] = None) -> None:
+        self.games = games
+        self.error = error
+        self.quit_count = 0
+
+    def switch_profile(self, config: FetchConfig) -> None:
+        pass
+
+    def get_game_list(self) -> List[Game]:
+        if self.error is not None:
+            raise self.error
+        return self.games
+
+    def quit(self) -> None:
+        self.quit_count += 1
+
+
+def test_refresh_recovers_from_failed_drivers(fetch_config):
+    fetch_config = dataclasses.replace(fetch_config, no_achievements=True)
+    fake_server = FakeServer()
+    publisher = make_publisher(fetch_config, fake_server)
+
+    dead_driver = FakeDriver([], error=PlaywrightError("Target page, context or browser has been closed"))
+    working_driver = FakeDriver(fake_fetch(1, 2, 3))
+    # The login times out, then the browser dies, then everything works
+    drivers = [TimeoutException("Waited too long (60s) for user login"), dead_driver, working_driver]
+
+    def make_driver(config: FetchConfig) -> FakeDriver:
+        driver = drivers.pop(0)
+        if isinstance(driver, Exception):
+            raise driver
+        return driver
+
+    delays: List[float] = []
+
+    def sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 4:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        refresh_forever(fetch_config, 60, publisher.on_profile_fetched, make_driver=make_driver, sleep=sleep)
+
+    assert drivers == []
+    assert dead_driver.quit_count == 1
+    assert working_driver.quit_count == 1, "The working driver wasn't kept, then quit at the end"
+    assert fake_server.pages[-1].body == b"Game 0,Game 1,Game 2"
+    assert len(load_from_file(fetch_config.destination_file)) == 3
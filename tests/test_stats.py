@@ -0,0 +1,86 @@
+import json
+from datetime import date, datetime
+
+from src.config import FetchConfig
+from src.drawing import get_heat_level, prepare_heatmap_for_display
+from src.models import DayIndex, Event, Game
+from src.stats import build_day_index, get_day_index, get_period_totals, get_top_games
+from src.storage import get_index_path, load_day_index, save_to_file
+
+
+def make_game(game_id: str, name: str, *dates: datetime) -> Game:
+    events = [Event.create_achievement_event(event_date=d, title="Title", desc="Desc") for d in dates]
+    return Game(id=game_id, name=name, events=events)
+
+
+# Naive datetimes are considered local, so the days don't depend on the timezone
+GAMES = [
+    make_game("1", "A Hat in Time", datetime(2022, 9, 16, 12), datetime(2022, 9, 16, 13), datetime(2022, 11, 2, 12)),
+    make_game("2", "DEATHLOOP", datetime(2022, 9, 16, 20), datetime(2023, 1, 5, 12)),
+    make_game("3", "Team Fortress 2"),
+]
+
+
+def test_build_day_index():
+    index = build_day_index(GAMES)
+    assert index.day_counts == {
+        date(2022, 9, 16): 3,
+        date(2022, 11, 2): 1,
+        date(2023, 1, 5): 1,
+    }
+    assert index.game_day_counts["2"] == {date(2022, 9, 16): 1, date(2023, 1, 5): 1}
+    assert index.game_names["2"] == "DEATHLOOP"
+    assert "3" not in index.game_day_counts
+
+
+def test_period_totals_and_top_games():
+    index = build_day_index(GAMES)
+    assert get_period_totals(index, "month") == {"2022-09": 3, "2022-11": 1, "2023-01": 1}
+    assert get_period_totals(index, "year") == {"2022": 4, "2023": 1}
+    assert get_top_games(index, "year", limit=1) == {
+        "2022": [("A Hat in Time", 3)],
+        "2023": [("DEATHLOOP", 1)],
+    }
+
+
+
+def test_top_games_keep_games_with_the_same_name_apart():
+    games = [
+        make_game("1", "Same name", datetime(2022, 9, 1, 12)),
+        make_game("2", "Same name", datetime(2022, 9, 2, 12), datetime(2022, 9, 3, 12)),
+    ]
+    assert get_top_games(build_day_index(games), "month", limit=3) == {
+        "2022-09": [("Same name", 2), ("Same name", 1)],
+    }
+
+
+def test_day_index_is_saved_and_reused(tmp_path):
+    data_file = tmp_path / "dump.json"
+    save_to_file(GAMES, config=FetchConfig(profile_url="", destination_file=data_file))
+
+    index = get_day_index(data_file)
+    saved_index = load_day_index(get_index_path(data_file))
+    assert saved_index == index
+
+    # The cached index is returned as long as the data file doesn't change
+    stat = data_file.stat()
+    cached_index = DayIndex(source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+    get_index_path(data_file).write_text(json.dumps(cached_index.to_json()))
+    assert get_day_index(data_file) == cached_index
+
+
+def test_prepare_heatmap_for_display():
+    data = prepare_heatmap_for_display(build_day_index(GAMES))
+    assert [(m.year, m.month, m.event_count) for m in data] == [
+        (2022, 9, 3), (2022, 10, 0), (2022, 11, 1), (2022, 12, 0), (2023, 1, 1),
+    ]
+    day_16 = next(d for d in data[0].days if d.day == 16)
+    assert (day_16.event_count, day_16.level) == (3, 4)
+    assert prepare_heatmap_for_display(build_day_index([])) is None
+
+
+def test_get_heat_level():
+    assert get_heat_level(0, 8) == 0
+    assert get_heat_level(1, 8) == 1
+    assert get_heat_level(3, 8) == 2
+    assert get_heat_level(8, 8) == 4
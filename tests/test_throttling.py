@@ -0,0 +1,49 @@
+from src.throttling import RateLimiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+def make_limiter(clock: FakeClock, **kwargs) -> RateLimiter:
+    return RateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_burst_then_rate():
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_rate=2.0, capacity=3)
+    for _ in range(3):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == 0.5
+    # Tokens come back while the page loads
+    clock.now += 1.0
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 0
+
+
+def test_adaptive_backoff():
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_rate=1.0, capacity=1, base_backoff=5.0)
+    limiter.acquire()
+    assert limiter.penalize() == 5.0
+    assert limiter.penalize() == 10.0
+    assert limiter.rate == 0.25
+    # Wait for the backoff, then for the tokens at the lowered rate
+    assert limiter.acquire() == 10.0
+    assert limiter.acquire() == 4.0
+
+    limiter.reward()
+    assert limiter.rate == 0.35
+    for _ in range(10):
+        limiter.reward()
+    assert limiter.rate == 1.0
+    assert limiter.consecutive_penalties == 0